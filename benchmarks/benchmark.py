@@ -0,0 +1,268 @@
+"""
+Benchmark offline dos parsers de cada tribunal e das etapas de unificação e exportação.
+
+Usa as respostas gravadas em benchmarks/fixtures, repetidas até somar o número de decisões
+pedido, e mede para cada etapa o tempo, as linhas por segundo e o pico de memória (tracemalloc).
+O resultado é gravado em JSON para comparar execuções e detectar regressões.
+
+Uso:
+    python benchmarks/benchmark.py --decisoes 10000
+    python benchmarks/benchmark.py --decisoes 100000 --estagios tjpr unificacao
+    python benchmarks/benchmark.py --comparar benchmarks/resultados/base.json --tolerancia 0.25
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(RAIZ, "benchmarks", "fixtures")
+sys.path.insert(0, RAIZ)
+
+import crawler_v4 as crawler  # noqa: E402
+
+TERMOS = ["união homoafetiva", "transexual", "nome social", "homofobia", "orientação sexual"]
+
+
+def ler_fixture(nome):
+    with open(os.path.join(FIXTURES, nome), encoding="utf-8") as f:
+        return f.read()
+
+
+def preparar_tjsp(decisoes):
+    html = ler_fixture("tjsp_pagina.html")
+    por_pagina = len(crawler.extrair_processos_tjsp(html))
+    paginas = math.ceil(decisoes / por_pagina)
+
+    def executar():
+        resultados = crawler.AcumuladorResultados()
+        for _ in range(paginas):
+            resultados.adicionar(crawler.processar_resultados_tjsp(crawler.extrair_processos_tjsp(html), "benchmark"))
+        return resultados.para_dataframe()
+
+    return executar, paginas * por_pagina
+
+
+def preparar_tjba(decisoes):
+    texto = ler_fixture("tjba_pagina.json")
+    filtro = json.loads(texto)["data"]["p0"]
+    por_pagina = len(filtro["decisoes"])
+    paginas = math.ceil(decisoes / por_pagina)
+
+    def executar():
+        resultados = crawler.AcumuladorResultados()
+        for _ in range(paginas):
+            filtro = json.loads(texto)["data"]["p0"]
+            resultados.adicionar(crawler.processar_resultados_tjba(filtro["decisoes"], filtro["itemCount"], filtro["pageCount"], "benchmark"))
+        return resultados.para_dataframe()
+
+    return executar, paginas * por_pagina
+
+
+def preparar_tjdf(decisoes):
+    texto = ler_fixture("tjdf_pagina.json")
+    por_pagina = len(json.loads(texto)["registros"])
+    paginas = math.ceil(decisoes / por_pagina)
+
+    def executar():
+        resultados = crawler.AcumuladorResultados()
+        for _ in range(paginas):
+            resultados.adicionar(crawler.processar_resultados_tjdf(json.loads(texto), "benchmark"))
+        return resultados.para_dataframe()
+
+    return executar, paginas * por_pagina
+
+
+def preparar_tjpr(decisoes):
+    html = ler_fixture("tjpr_pagina.html")
+    por_pagina = len(crawler.extrair_registros_tjpr(html, "benchmark"))
+    paginas = math.ceil(decisoes / por_pagina)
+
+    def executar():
+        resultados = crawler.AcumuladorResultados()
+        for _ in range(paginas):
+            resultados.adicionar(crawler.processar_resultados_tjpr(html, "benchmark"))
+        return resultados.para_dataframe()
+
+    return executar, paginas * por_pagina
+
+
+def preparar_tjap(decisoes):
+    texto = ler_fixture("tjap_resposta.json")
+    por_resposta = len(json.loads(texto)["dados"])
+    respostas = math.ceil(decisoes / por_resposta)
+
+    def executar():
+        resultados = crawler.AcumuladorResultados()
+        for _ in range(respostas):
+            resultados.adicionar(crawler.processar_resultados_tjap(json.loads(texto), "benchmark"))
+        return resultados.para_dataframe()
+
+    return executar, respostas * por_resposta
+
+
+def resultados_sinteticos(decisoes, semente=42):
+    """
+    Monta `decisoes` linhas a partir das fixtures de todos os tribunais, com números de processo
+    sintéticos que se repetem entre termos e tribunais, para a unificação ter trabalho real.
+    """
+    base = pd.concat([
+        crawler.processar_resultados_tjsp(crawler.extrair_processos_tjsp(ler_fixture("tjsp_pagina.html")), ""),
+        crawler.processar_resultados_tjba(json.loads(ler_fixture("tjba_pagina.json"))["data"]["p0"]["decisoes"], 0, 0, ""),
+        crawler.processar_resultados_tjdf(json.loads(ler_fixture("tjdf_pagina.json")), ""),
+        crawler.processar_resultados_tjpr(ler_fixture("tjpr_pagina.html"), ""),
+        crawler.processar_resultados_tjap(json.loads(ler_fixture("tjap_resposta.json")), ""),
+    ], ignore_index=True)
+
+    gerador = np.random.default_rng(semente)
+    resultados = base.iloc[np.arange(decisoes) % len(base)].reset_index(drop=True)
+    distintos = max(1, int(decisoes * 0.75))
+    sequenciais = gerador.integers(0, distintos, size=decisoes)
+    anos = 2015 + sequenciais % 10
+    # Números CNJ válidos, com dígito verificador, escritos como cada tribunal costuma escrever
+    digitos = 98 - (sequenciais * 10 ** 11 + anos * 10 ** 7 + 8 * 10 ** 6 + 26 * 10 ** 4) % 97 * 100 % 97
+    resultados["Número do Processo"] = [
+        f"{n:07d}-{d:02d}.{a}.8.26.0000" if n % 3 else f"{n:07d}{d:02d}{a}8260000"
+        for n, d, a in zip(sequenciais, digitos, anos)
+    ]
+    resultados["Termos"] = np.array(TERMOS, dtype=object)[gerador.integers(0, len(TERMOS), size=decisoes)]
+    return resultados
+
+
+def preparar_unificacao(decisoes):
+    resultados = resultados_sinteticos(decisoes)
+    return (lambda: crawler.unificar_resultados(resultados)), len(resultados)
+
+
+def preparar_exportacao(formato):
+    def preparar(decisoes):
+        resultados = crawler.unificar_resultados(resultados_sinteticos(decisoes))
+
+        def executar():
+            return crawler.exportar_resultados(resultados, formato)
+
+        return executar, len(resultados)
+
+    return preparar
+
+
+ESTAGIOS = {
+    "tjsp": preparar_tjsp,
+    "tjba": preparar_tjba,
+    "tjdf": preparar_tjdf,
+    "tjpr": preparar_tjpr,
+    "tjap": preparar_tjap,
+    "unificacao": preparar_unificacao,
+    "excel": preparar_exportacao("xlsx"),
+    "parquet": preparar_exportacao("parquet"),
+    "csv": preparar_exportacao("csv"),
+    "jsonl": preparar_exportacao("jsonl"),
+}
+
+
+def medir(nome, executar, linhas, medir_memoria):
+    """
+    `linhas` é o número de linhas de entrada da etapa, e não o da saída: a unificação devolve
+    menos linhas do que recebe, e a vazão não pode depender da proporção de duplicadas.
+    """
+    gc.collect()
+    inicio = time.perf_counter()
+    resultado = executar()
+    segundos = time.perf_counter() - inicio
+    del resultado
+
+    pico_mb = None
+    if medir_memoria:
+        # Segunda execução só para a memória, já que o tracemalloc deixa tudo mais lento
+        gc.collect()
+        tracemalloc.start()
+        executar()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        pico_mb = pico / 1024 / 1024
+
+    return {
+        "estagio": nome,
+        "linhas": linhas,
+        "segundos": round(segundos, 4),
+        "linhas_por_segundo": round(linhas / segundos, 1) if segundos else None,
+        "pico_memoria_mb": round(pico_mb, 2) if pico_mb is not None else None,
+    }
+
+
+def comparar(atual, base, tolerancia):
+    """Lista as etapas mais lentas ou mais pesadas que a base além da tolerância."""
+    anteriores = {item["estagio"]: item for item in base["estagios"]}
+    regressoes = []
+    for item in atual["estagios"]:
+        anterior = anteriores.get(item["estagio"])
+        if not anterior:
+            continue
+        if anterior.get("linhas_por_segundo") and item["linhas_por_segundo"] < anterior["linhas_por_segundo"] * (1 - tolerancia):
+            regressoes.append(f"{item['estagio']}: {item['linhas_por_segundo']:.0f} linhas/s (base {anterior['linhas_por_segundo']:.0f})")
+        if anterior.get("pico_memoria_mb") and item["pico_memoria_mb"] and item["pico_memoria_mb"] > anterior["pico_memoria_mb"] * (1 + tolerancia):
+            regressoes.append(f"{item['estagio']}: pico de {item['pico_memoria_mb']:.1f} MB (base {anterior['pico_memoria_mb']:.1f} MB)")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--decisoes", type=int, default=10000, help="decisões por etapa (ex.: 10000 a 1000000)")
+    parser.add_argument("--estagios", nargs="+", choices=list(ESTAGIOS), default=list(ESTAGIOS))
+    parser.add_argument("--sem-memoria", action="store_true", help="não mede o pico de memória")
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: benchmarks/resultados/benchmark_<data>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="piora relativa aceita na comparação")
+    args = parser.parse_args()
+
+    # As bibliotecas importadas no primeiro uso (pyarrow, bs4, xlsxwriter...) não entram na medição
+    crawler.carregar_modulos_tardios()
+
+    relatorio = {
+        "executado_em": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "parser_html": crawler.PARSER_HTML,
+        "decisoes": args.decisoes,
+        "estagios": [],
+    }
+
+    print(f"{'etapa':<12} {'linhas':>10} {'segundos':>10} {'linhas/s':>12} {'pico MB':>10}")
+    for nome in args.estagios:
+        executar, linhas = ESTAGIOS[nome](args.decisoes)
+        item = medir(nome, executar, linhas, not args.sem_memoria)
+        relatorio["estagios"].append(item)
+        pico = f"{item['pico_memoria_mb']:.1f}" if item["pico_memoria_mb"] is not None else "-"
+        print(f"{nome:<12} {item['linhas']:>10} {item['segundos']:>10.3f} {item['linhas_por_segundo']:>12.0f} {pico:>10}")
+
+    saida = args.saida or os.path.join(
+        RAIZ, "benchmarks", "resultados", f"benchmark_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
+    )
+    os.makedirs(os.path.dirname(saida), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        regressoes = comparar(relatorio, base, args.tolerancia)
+        if regressoes:
+            print("⚠️ Regressões em relação à base:")
+            for regressao in regressoes:
+                print(f"  - {regressao}")
+            sys.exit(1)
+        print("✅ Nenhuma regressão em relação à base.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Mede a vazão do extrator do TJPR (páginas por segundo) sobre páginas salvas em benchmarks/fixtures.
+
+Uso:
+    python benchmarks/benchmark_tjpr.py [--repeticoes 200] [páginas .html ...]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from crawler_v4 import extrair_registros_tjpr, processar_resultados_tjpr  # noqa: E402
+
+
+def medir(funcao, paginas, repeticoes):
+    # Uma rodada fora da medição: importações tardias (pandas, bs4...) e caches do primeiro uso
+    for html in paginas:
+        funcao(html, "benchmark")
+
+    linhas = 0
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for html in paginas:
+            linhas += len(funcao(html, "benchmark"))
+    duracao = time.perf_counter() - inicio
+    total_paginas = repeticoes * len(paginas)
+    return total_paginas / duracao, linhas / duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paginas", nargs="*", help="arquivos HTML do TJPR (padrão: benchmarks/fixtures/tjpr_*.html)")
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    arquivos = args.paginas or sorted(glob.glob(os.path.join(RAIZ, "benchmarks", "fixtures", "tjpr_*.html")))
+    if not arquivos:
+        sys.exit("Nenhuma página do TJPR encontrada.")
+    paginas = []
+    for arquivo in arquivos:
+        with open(arquivo, encoding="utf-8") as f:
+            paginas.append(f.read())
+
+    tamanho_kb = sum(len(html.encode("utf-8")) for html in paginas) / len(paginas) / 1024
+    print(f"{len(paginas)} página(s) do TJPR, {tamanho_kb:.0f} KB em média, {args.repeticoes} repetições")
+    for nome, funcao in (("extrair_registros_tjpr", extrair_registros_tjpr), ("processar_resultados_tjpr", processar_resultados_tjpr)):
+        paginas_s, linhas_s = medir(funcao, paginas, args.repeticoes)
+        print(f"{nome:<28} {paginas_s:10.1f} páginas/s {linhas_s:12.1f} linhas/s")
+
+
+if __name__ == "__main__":
+    main()
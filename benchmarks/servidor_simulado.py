@@ -0,0 +1,395 @@
+"""
+Servidor local que imita os endpoints usados pelo crawler, para testes de carga sem tocar nos tribunais.
+
+Atende, no mesmo endereço e com os mesmos caminhos dos sites reais:
+    TJBA   POST /graphql                                  (aliases pN: filter(...))
+    TJDFT  POST /api/v1/pesquisa
+    TJPR   GET  /jurisprudencia/publico/pesquisa.do
+    TJAP   POST /api/publico/consultar-jurisprudencia
+    TJSP   GET/POST /cjsg/consultaCompleta.do e GET /cjsg/trocaDePagina.do
+    2Captcha GET /in.php e /res.php
+
+As respostas são geradas de forma determinística a partir de (tribunal, termo, página), com latência,
+taxa de erro, limite de requisições simultâneas (HTTP 429), número de páginas e tamanho das ementas
+configuráveis.
+
+Uso:
+    python benchmarks/servidor_simulado.py --porta 8765 --latencia 0.2 --taxa-erro 0.01 --paginas 30
+
+e, em outro terminal, as variáveis impressas pelo servidor antes de `streamlit run crawler_v4.py`.
+"""
+import argparse
+import html
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+CAMINHOS = {
+    "URL_TJBA": "/graphql",
+    "URL_TJDF": "/api/v1/pesquisa",
+    "URL_TJPR": "/jurisprudencia/publico/pesquisa.do",
+    "URL_TJAP": "/api/publico/consultar-jurisprudencia",
+    "URL_TJSP": "/cjsg/consultaCompleta.do",
+    "URL_TJSP_TROCA_PAGINA": "/cjsg/trocaDePagina.do",
+    "URL_2CAPTCHA": "",
+}
+
+TAMANHO_PAGINA_TJSP = 20
+
+TRECHOS_EMENTA = [
+    "APELAÇÃO CÍVEL.", "DIREITO DE FAMÍLIA.", "UNIÃO ESTÁVEL HOMOAFETIVA.", "RECONHECIMENTO.",
+    "ENTIDADE FAMILIAR.", "ADI 4277/DF.", "RETIFICAÇÃO DE REGISTRO CIVIL.", "NOME SOCIAL.",
+    "DANO MORAL POR DISCRIMINAÇÃO EM RAZÃO DE ORIENTAÇÃO SEXUAL.", "RECURSO PARCIALMENTE PROVIDO.",
+]
+RELATORES = ["Fulano de Tal", "Beltrana Souza", "Ciclano Pereira", "Maria das Graças Lima"]
+ORGAOS = ["1ª Câmara de Direito Privado", "3ª Turma Cível", "Câmara Única", "2ª Câmara Cível"]
+
+
+class Configuracao:
+    def __init__(self, latencia=0.0, variacao_latencia=0.0, taxa_erro=0.0, paginas=10, tamanho_ementa=600, atraso_captcha=1.0, semente=0,
+                 limite_simultaneas=0, retry_after=1):
+        self.latencia = latencia
+        self.variacao_latencia = variacao_latencia
+        self.taxa_erro = taxa_erro
+        self.limite_simultaneas = limite_simultaneas  # 0 = sem limite
+        self.retry_after = retry_after
+        self.paginas = paginas
+        self.tamanho_ementa = tamanho_ementa
+        self.atraso_captcha = atraso_captcha
+        self.semente = semente
+
+
+class Decisao:
+    """Dados de uma decisão sintética, estáveis para o mesmo (tribunal, termo, posição)."""
+
+    def __init__(self, configuracao, tribunal, termo, posicao):
+        gerador = random.Random(f"{configuracao.semente}|{tribunal}|{termo}|{posicao}")
+        sequencial, ano = gerador.randrange(10 ** 7), gerador.randrange(2010, 2025)
+        tribunal, origem = gerador.randrange(1, 28), gerador.randrange(10 ** 4)
+        digito = 98 - int(f"{sequencial:07d}{ano}8{tribunal:02d}{origem:04d}00") % 97
+        self.numero = f"{sequencial:07d}-{digito:02d}.{ano}.8.{tribunal:02d}.{origem:04d}"
+        self.codigo = str(10 ** 7 + gerador.randrange(9 * 10 ** 7))
+        self.relator = gerador.choice(RELATORES)
+        self.orgao = gerador.choice(ORGAOS)
+        self.data = f"2024-{gerador.randrange(1, 13):02d}-{gerador.randrange(1, 29):02d}"
+        trechos = [termo.upper() + "."]
+        while sum(len(trecho) + 1 for trecho in trechos) < configuracao.tamanho_ementa:
+            trechos.append(gerador.choice(TRECHOS_EMENTA))
+        self.ementa = " ".join(trechos)
+
+    @property
+    def data_br(self):
+        ano, mes, dia = self.data.split("-")
+        return f"{dia}/{mes}/{ano}"
+
+
+class SimuladorTribunais:
+    """Gera as respostas de cada tribunal no formato que o crawler espera."""
+
+    def __init__(self, configuracao):
+        self.configuracao = configuracao
+        self._ids_captcha = itertools.count(1)
+        self._captchas = {}
+        self._trava = threading.Lock()
+        self._em_andamento = {}
+
+    def entrar(self, caminho):
+        """Ocupa uma vaga do serviço; False quando ele já está no limite de requisições simultâneas."""
+        with self._trava:
+            ocupadas = self._em_andamento.get(caminho, 0)
+            limitado = self.configuracao.limite_simultaneas and caminho not in ("/in.php", "/res.php")
+            if limitado and ocupadas >= self.configuracao.limite_simultaneas:
+                return False
+            self._em_andamento[caminho] = ocupadas + 1
+            return True
+
+    def sair(self, caminho):
+        with self._trava:
+            self._em_andamento[caminho] -= 1
+
+    def decisoes(self, tribunal, termo, pagina, tamanho):
+        """Decisões da página `pagina` (a partir de 0); vazia depois da última página."""
+        if pagina < 0 or pagina >= self.configuracao.paginas:
+            return []
+        return [Decisao(self.configuracao, tribunal, termo, pagina * tamanho + i) for i in range(tamanho)]
+
+    def total(self, tamanho):
+        return self.configuracao.paginas * tamanho
+
+    def tjba(self, corpo):
+        variaveis = corpo.get("variables", {})
+        termo = variaveis.get("decisaoFilter", {}).get("assunto", "")
+        tamanho = variaveis.get("itemsPerPage", 10)
+        dados = {}
+        for alias, pagina in re.findall(r"(\w+):\s*filter\([^)]*pageNumber:\s*(\d+)", corpo.get("query", "")):
+            dados[alias] = {
+                "decisoes": [
+                    {
+                        "dataPublicacao": f"{d.data}T00:00:00",
+                        "relator": {"nome": d.relator},
+                        "orgaoJulgador": {"nome": d.orgao},
+                        "classe": {"descricao": "Apelação"},
+                        "conteudo": d.ementa,
+                        "hash": d.codigo,
+                        "numeroProcesso": d.numero,
+                    }
+                    for d in self.decisoes("TJBA", termo, int(pagina), tamanho)
+                ],
+                "pageCount": self.configuracao.paginas,
+                "itemCount": self.total(tamanho),
+            }
+        return {"data": dados}
+
+    def tjdf(self, corpo):
+        tamanho = corpo.get("tamanho", 10)
+        return {
+            "hits": {"value": self.total(tamanho)},
+            "registros": [
+                {
+                    "processo": d.numero,
+                    "nomeRelator": d.relator,
+                    "descricaoOrgaoJulgador": d.orgao,
+                    "dataPublicacao": d.data,
+                    "identificador": d.codigo,
+                    "ementa": d.ementa,
+                }
+                for d in self.decisoes("TJDFT", corpo.get("query", ""), corpo.get("pagina", 0), tamanho)
+            ],
+        }
+
+    def tjap(self, corpo):
+        termo = corpo.get("ementa", "")
+        decisoes = [d for pagina in range(self.configuracao.paginas) for d in self.decisoes("TJAP", termo, pagina, 10)]
+        return {
+            "dados": [
+                {
+                    "numeroano": d.numero,
+                    "nomerelator": d.relator,
+                    "lotacao": d.orgao,
+                    "datajulgamento": d.data,
+                    "textoementa": d.ementa,
+                }
+                for d in decisoes
+            ]
+        }
+
+    def tjpr(self, parametros):
+        termo = parametros.get("criterioPesquisa", "")
+        tamanho = int(parametros.get("pageSize", 10))
+        pagina = int(parametros.get("pageNumber", 1)) - 1
+        documentos = []
+        for i, d in enumerate(self.decisoes("TJPR", termo, pagina, tamanho), start=1):
+            documentos.append(
+                f'<a name="DOC{i}"></a>\n'
+                f'<tr><td class="label"><b>Processo:</b></td><td>\n'
+                f'  <div class="processo">\n    <div>{d.numero}</div>\n  </div>\n</td></tr>\n'
+                f'<tr><td><b>Relator(a):</b> {d.relator}<br></td></tr>\n'
+                f'<tr><td><b>Órgão Julgador:</b> {d.orgao}</td></tr>\n'
+                f'<tr><td><b>Fonte/Data da Publicação:</b>&nbsp;Tue Mar 05 00:00:00 BRT {d.data[:4]}</td></tr>\n'
+                f'<tr><td><b>Ementa:</b><div id="ementa{i}" class="ementa">{html.escape(d.ementa)}</div></td></tr>\n'
+            )
+        return (
+            "<html><head><title>Jurisprudência - TJPR</title></head><body>"
+            f'<div class="navLeft">{self.total(tamanho)} registro(s) encontrado(s)</div>'
+            f'<table>{"".join(documentos)}</table></body></html>'
+        )
+
+    def tjsp_formulario(self):
+        return (
+            "<html><head><title>e-SAJ - Consulta Completa</title></head><body>"
+            '<form name="consultaCompletaForm" method="post" action="consultaCompleta.do">'
+            '<input type="text" name="dados.buscaInteiroTeor" value="">'
+            '<input type="hidden" name="tipoDecisaoSelecionados" value="A">'
+            '<input type="hidden" id="id_recaptcha_response_token" name="id_recaptcha_response_token" value="">'
+            '<input type="submit" name="pbSubmit" value="Pesquisar">'
+            "</form></body></html>"
+        )
+
+    def tjsp_resultados(self, termo, pagina):
+        decisoes = self.decisoes("TJSP", termo, pagina, TAMANHO_PAGINA_TJSP)
+        if not decisoes:
+            return "<html><body><div>Nenhum resultado encontrado.</div></body></html>"
+        linhas = []
+        for i, d in enumerate(decisoes, start=pagina * TAMANHO_PAGINA_TJSP + 1):
+            linhas.append(
+                '<tr class="fundocinza1"><td><table>'
+                f'<tr><td>{i} - <a class="esajLinkLogin downloadEmenta" cdacordao="{d.codigo}">{d.numero}</a></td></tr>'
+                f'<tr class="ementaClass2"><td><strong>Relator(a):</strong> {d.relator}</td></tr>'
+                f'<tr class="ementaClass2"><td><strong>Órgão julgador:</strong> {d.orgao}</td></tr>'
+                f'<tr class="ementaClass2"><td><strong>Data de publicação:</strong> {d.data_br}</td></tr>'
+                f'<tr class="ementaClass2"><td><strong>Ementa:</strong> {html.escape(d.ementa)}</td></tr>'
+                f'<tr><td><div id="textAreaDados_{d.codigo}" style="display:none">{html.escape(d.ementa)}</div></td></tr>'
+                "</table></td></tr>"
+            )
+        proxima = ' <a href="#">&gt;</a>' if pagina + 1 < self.configuracao.paginas else ""
+        return (
+            "<html><body><div id=\"divDadosResultado-A\"><table>"
+            f'{"".join(linhas)}</table><div class="paginacao"><a href="#">{pagina + 1}</a>{proxima}</div></div></body></html>'
+        )
+
+    def captcha_enviar(self):
+        with self._trava:
+            identificador = str(next(self._ids_captcha))
+            self._captchas[identificador] = time.time() + self.configuracao.atraso_captcha
+        return {"status": 1, "request": identificador}
+
+    def captcha_resultado(self, identificador):
+        with self._trava:
+            pronto_em = self._captchas.get(identificador)
+            if pronto_em is None:
+                return {"status": 0, "request": "ERROR_WRONG_CAPTCHA_ID"}
+            if time.time() < pronto_em:
+                return {"status": 0, "request": "CAPCHA_NOT_READY"}
+            del self._captchas[identificador]
+        return {"status": 1, "request": f"token-simulado-{identificador}"}
+
+
+class ManipuladorSimulado(BaseHTTPRequestHandler):
+    simulador = None  # definido por criar_servidor
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _simular_rede(self):
+        """
+        Aplica a latência configurada e decide se esta requisição vai falhar: HTTP 429 com
+        Retry-After quando o serviço já atende o limite de requisições simultâneas, ou HTTP 500.
+        """
+        configuracao = self.simulador.configuracao
+        caminho = urlparse(self.path).path
+        if not self.simulador.entrar(caminho):
+            self._responder(429, "text/plain", "Muitas requisições", {"Retry-After": str(configuracao.retry_after)})
+            return False
+        try:
+            atraso = random.gauss(configuracao.latencia, configuracao.variacao_latencia) if configuracao.variacao_latencia else configuracao.latencia
+            if atraso > 0:
+                time.sleep(atraso)
+        finally:
+            self.simulador.sair(caminho)
+        if random.random() < configuracao.taxa_erro:
+            self._responder(500, "text/plain", "Erro simulado")
+            return False
+        return True
+
+    def _responder(self, codigo, tipo, conteudo, cabecalhos=None):
+        corpo = conteudo.encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", f"{tipo}; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _json(self, dados):
+        self._responder(200, "application/json", json.dumps(dados, ensure_ascii=False))
+
+    def _corpo(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(tamanho).decode("utf-8") if tamanho else ""
+
+    def _termo_da_sessao(self):
+        for cookie in (self.headers.get("Cookie") or "").split(";"):
+            nome, _, valor = cookie.strip().partition("=")
+            if nome == "termo_simulado":
+                return unquote(valor)
+        return ""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(url.query).items()}
+        if not self._simular_rede():
+            return
+        if url.path == CAMINHOS["URL_TJPR"]:
+            self._responder(200, "text/html", self.simulador.tjpr(parametros))
+        elif url.path == CAMINHOS["URL_TJSP"]:
+            self._responder(200, "text/html", self.simulador.tjsp_formulario())
+        elif url.path == CAMINHOS["URL_TJSP_TROCA_PAGINA"]:
+            pagina = int(parametros.get("pagina", 1)) - 1
+            self._responder(200, "text/html", self.simulador.tjsp_resultados(self._termo_da_sessao(), pagina))
+        elif url.path == "/in.php":
+            self._json(self.simulador.captcha_enviar())
+        elif url.path == "/res.php":
+            self._json(self.simulador.captcha_resultado(parametros.get("id", "")))
+        else:
+            self._responder(404, "text/plain", "Não encontrado")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        corpo = self._corpo()
+        if not self._simular_rede():
+            return
+        if url.path == CAMINHOS["URL_TJBA"]:
+            self._json(self.simulador.tjba(json.loads(corpo)))
+        elif url.path == CAMINHOS["URL_TJDF"]:
+            self._json(self.simulador.tjdf(json.loads(corpo)))
+        elif url.path == CAMINHOS["URL_TJAP"]:
+            self._json(self.simulador.tjap(json.loads(corpo)))
+        elif url.path == CAMINHOS["URL_TJSP"]:
+            # Os cookies guardam o termo, como a sessão do e-SAJ, para a troca de página
+            termo = parse_qs(corpo).get("dados.buscaInteiroTeor", [""])[-1]
+            self._responder(
+                200, "text/html", self.simulador.tjsp_resultados(termo, 0),
+                {"Set-Cookie": f"termo_simulado={quote(termo)}; Path=/"}
+            )
+        else:
+            self._responder(404, "text/plain", "Não encontrado")
+
+
+def criar_servidor(configuracao, host="127.0.0.1", porta=8765):
+    """Cria o servidor (porta 0 escolhe uma livre); use `serve_forever` em uma thread."""
+    manipulador = type("Manipulador", (ManipuladorSimulado,), {"simulador": SimuladorTribunais(configuracao)})
+    servidor = ThreadingHTTPServer((host, porta), manipulador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def variaveis_ambiente(servidor):
+    """Variáveis que apontam o crawler para o servidor simulado."""
+    host, porta = servidor.server_address[:2]
+    base = f"http://{host}:{porta}"
+    variaveis = {nome: base + caminho for nome, caminho in CAMINHOS.items()}
+    variaveis["CHAVE_2CAPTCHA"] = "chave-simulada"
+    return variaveis
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.0, help="latência média por requisição (s)")
+    parser.add_argument("--variacao-latencia", type=float, default=0.0, help="desvio padrão da latência (s)")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração das requisições que recebem HTTP 500")
+    parser.add_argument("--limite-simultaneas", type=int, default=0, help="requisições simultâneas por serviço antes do HTTP 429 (0 = sem limite)")
+    parser.add_argument("--retry-after", type=int, default=1, help="segundos pedidos no Retry-After dos 429")
+    parser.add_argument("--paginas", type=int, default=10, help="páginas de resultado por termo em cada tribunal")
+    parser.add_argument("--tamanho-ementa", type=int, default=600, help="tamanho aproximado de cada ementa (caracteres)")
+    parser.add_argument("--atraso-captcha", type=float, default=1.0, help="tempo até o CAPTCHA simulado ficar pronto (s)")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    configuracao = Configuracao(
+        latencia=args.latencia, variacao_latencia=args.variacao_latencia, taxa_erro=args.taxa_erro,
+        paginas=args.paginas, tamanho_ementa=args.tamanho_ementa, atraso_captcha=args.atraso_captcha, semente=args.semente,
+        limite_simultaneas=args.limite_simultaneas, retry_after=args.retry_after,
+    )
+    servidor = criar_servidor(configuracao, args.host, args.porta)
+    print("🧪 Servidor simulado no ar. Para usar com o crawler:")
+    for nome, valor in variaveis_ambiente(servidor).items():
+        print(f"export {nome}={valor}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
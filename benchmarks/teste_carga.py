@@ -0,0 +1,61 @@
+"""
+Teste de carga de ponta a ponta: sobe o servidor simulado e roda `buscar_jurisprudencias_unificadas`
+contra ele, medindo o tempo total e quantas decisões cada tribunal devolveu.
+
+Uso:
+    python benchmarks/teste_carga.py --termos "união homoafetiva" "nome social" --paginas 50 --latencia 0.3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from servidor_simulado import Configuracao, criar_servidor, variaveis_ambiente  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--termos", nargs="+", default=["união homoafetiva", "transexual", "nome social"])
+    parser.add_argument("--latencia", type=float, default=0.1)
+    parser.add_argument("--variacao-latencia", type=float, default=0.05)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--limite-simultaneas", type=int, default=0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--paginas", type=int, default=20)
+    parser.add_argument("--tamanho-ementa", type=int, default=600)
+    parser.add_argument("--atraso-captcha", type=float, default=1.0)
+    args = parser.parse_args()
+
+    configuracao = Configuracao(
+        latencia=args.latencia, variacao_latencia=args.variacao_latencia, taxa_erro=args.taxa_erro,
+        paginas=args.paginas, tamanho_ementa=args.tamanho_ementa, atraso_captcha=args.atraso_captcha,
+        limite_simultaneas=args.limite_simultaneas, retry_after=args.retry_after,
+    )
+    servidor = criar_servidor(configuracao, porta=0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    # Os endereços são lidos na importação do crawler, então o ambiente vem antes
+    os.environ.update(variaveis_ambiente(servidor))
+    # Cache, histórico e planilhas ficam em um diretório temporário
+    os.chdir(tempfile.mkdtemp(prefix="teste_carga_"))
+    import crawler_v4 as crawler
+
+    crawler.usar_cache = False
+    inicio = time.perf_counter()
+    resultados, total = crawler.buscar_jurisprudencias_unificadas(args.termos)
+    duracao = time.perf_counter() - inicio
+    servidor.shutdown()
+
+    print(f"⏱️ {len(args.termos)} termo(s) em {duracao:.1f}s: {total} decisões unificadas ({total / duracao:.0f}/s)")
+    for tribunal, quantidade in resultados["Tribunal"].value_counts().items():
+        print(f"  {tribunal}: {quantidade}")
+
+
+if __name__ == "__main__":
+    main()
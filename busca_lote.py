@@ -0,0 +1,70 @@
+"""
+Busca em lote, sem o Streamlit: roda os mesmos crawlers do crawler_v4.py e grava os resultados em disco.
+
+O navegador e o 2Captcha só são iniciados se o TJSP estiver entre os tribunais pedidos,
+então buscas só nos tribunais HTTP (TJAP, TJBA, TJDFT, TJPR) não precisam de Chrome nem de chave.
+
+Uso:
+    python busca_lote.py "união homoafetiva" "nome social"
+    python busca_lote.py --arquivo termos.txt --tribunais TJAP TJBA TJDFT TJPR --formatos parquet xlsx
+    python busca_lote.py --arquivo termos.txt --incremental      (ex.: no cron, toda noite)
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import crawler_v4 as crawler
+
+
+def ler_termos(args):
+    termos = list(args.termos)
+    if args.arquivo:
+        with open(args.arquivo, encoding="utf-8") as f:
+            # Um termo por linha (ou vários separados por vírgula); linhas com # são ignoradas
+            for linha in f:
+                linha = linha.strip()
+                if linha and not linha.startswith("#"):
+                    termos.extend(termo.strip() for termo in linha.split(",") if termo.strip())
+    # Sem repetições, mantendo a ordem
+    return list(dict.fromkeys(termos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("termos", nargs="*", help="termos de busca")
+    parser.add_argument("--arquivo", help="arquivo com um termo por linha")
+    parser.add_argument("--tribunais", nargs="+", choices=crawler.TRIBUNAIS, default=crawler.TRIBUNAIS)
+    parser.add_argument("--formatos", nargs="+", choices=list(crawler.FORMATOS_EXPORTACAO), default=["xlsx"])
+    parser.add_argument("--saida", default=os.path.join("resultados", "lotes"), help="pasta dos arquivos gerados")
+    parser.add_argument("--incremental", action="store_true", help="busca só as decisões novas desde a última coleta")
+    parser.add_argument("--sem-cache", action="store_true", help="ignora o cache e consulta os tribunais novamente")
+    args = parser.parse_args()
+
+    termos = ler_termos(args)
+    if not termos:
+        parser.error("informe ao menos um termo ou um --arquivo")
+
+    crawler.modo_incremental = args.incremental
+    crawler.usar_cache = not args.sem_cache and not args.incremental
+
+    inicio = time.perf_counter()
+    resultados, total = crawler.buscar_jurisprudencias_unificadas(termos, args.tribunais)
+
+    os.makedirs(args.saida, exist_ok=True)
+    nome = f"lote_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+    for formato in args.formatos:
+        caminho = os.path.join(args.saida, f"{nome}.{formato}")
+        with open(caminho, "wb") as f:
+            f.write(crawler.exportar_resultados(resultados, formato).getbuffer())
+        print(f"💾 {caminho}")
+
+    print(f"✅ {total} decisões de {len(termos)} termo(s) em {time.perf_counter() - inicio:.1f}s")
+    print(f"⏱️ Inicialização: {crawler.resumo_inicializacao()}")
+    if not total:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
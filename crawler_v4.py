@@ -1,830 +1,2009 @@
+import time
+
+# ⏱️ Marcado antes de qualquer importação, para medir o tempo de inicialização do módulo
+INICIO_IMPORTACAO = time.perf_counter()
+
 import streamlit as st
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-import plotly.express as px
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import re
-import pandas as pd
-import time
-import requests
 import json
 import io
+import html
 import os
+import math
+import random
+import sqlite3
+import hashlib
+import uuid
+import threading
+import queue
+import atexit
+import functools
+import importlib
+import importlib.util
+import subprocess
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait as aguardar_futuros, FIRST_COMPLETED
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin
+
+
+# ⏱️ Tempos de importação e inicialização pagos nesta execução (etapa -> segundos)
+TEMPOS_INICIALIZACAO = {}
+
+
+@contextmanager
+def medir_inicializacao(etapa):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        TEMPOS_INICIALIZACAO[etapa] = TEMPOS_INICIALIZACAO.get(etapa, 0) + time.perf_counter() - inicio
+
+
+def resumo_inicializacao():
+    """Tempos registrados até agora, do mais lento para o mais rápido."""
+    etapas = sorted(TEMPOS_INICIALIZACAO.items(), key=lambda item: item[1], reverse=True)
+    return ", ".join(f"{etapa}: {segundos:.2f}s" for etapa, segundos in etapas)
+
+
+class ModuloTardio:
+    """
+    Módulo importado só no primeiro acesso a um de seus atributos.
+
+    Abrir a interface ou buscar em tribunais que não usam o navegador não paga a importação
+    do selenium, do plotly ou do pandas; o tempo de cada importação feita fica registrado.
+    """
+
+    def __init__(self, nome):
+        self._nome = nome
+        self._modulo = None
+        self._lock = threading.Lock()
+
+    def carregar(self):
+        if self._modulo is None:
+            with self._lock:
+                if self._modulo is None:
+                    with medir_inicializacao(f"import {self._nome}"):
+                        self._modulo = importlib.import_module(self._nome)
+        return self._modulo
+
+    def __getattr__(self, atributo):
+        valor = getattr(self.carregar(), atributo)
+        # Guardado na instância: os próximos acessos nem passam pelo __getattr__
+        setattr(self, atributo, valor)
+        return valor
+
+
+# 🐢 Bibliotecas pesadas, importadas quando usadas pela primeira vez
+pd = ModuloTardio("pandas")
+np = ModuloTardio("numpy")
+pa = ModuloTardio("pyarrow")
+pc = ModuloTardio("pyarrow.compute")
+ds = ModuloTardio("pyarrow.dataset")
+pq = ModuloTardio("pyarrow.parquet")
+requests = ModuloTardio("requests")
+xlsxwriter = ModuloTardio("xlsxwriter")
+px = ModuloTardio("plotly.express")
+bs4 = ModuloTardio("bs4")
+webdriver = ModuloTardio("selenium.webdriver")
+EC = ModuloTardio("selenium.webdriver.support.expected_conditions")
+
+
+def carregar_modulos_tardios():
+    """Importa já todos os módulos tardios (ex.: antes de um benchmark, para a importação não entrar na medição)."""
+    for valor in list(globals().values()):
+        if isinstance(valor, ModuloTardio):
+            valor.carregar()
 
 # 🔑 Configuração do 2Captcha
-API_KEY = st.secrets["auth_token"]
+def obter_api_key():
+    # Lido só quando o 2Captcha é usado, para o módulo poder ser importado sem os segredos.
+    # A variável de ambiente permite rodar sem o secrets.toml (ex.: contra o servidor simulado)
+    return os.environ.get("CHAVE_2CAPTCHA") or st.secrets["auth_token"]
 
-# Variável global para armazenar o token do reCAPTCHA
-captcha_token = None
-captcha_expiration_time = 0  
 
-# 🚗 Configuração do Selenium (Anti-detecção)
-options = webdriver.ChromeOptions()
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--disable-blink-features=AutomationControlled")
-options.add_argument("--disable-extensions")
-options.add_argument("--disable-popup-blocking")
-options.add_argument("--disable-plugins-discovery")
-options.add_argument("--incognito")
-options.add_argument("--headless")
-options.add_argument("--disable-gpu")
-options.add_argument(
-    "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
-)
-options.add_experimental_option("excludeSwitches", ["enable-automation"])
-options.add_experimental_option('useAutomationExtension', False)
+# 🧰 Objetos compartilhados (sessões HTTP, caches, pools), um por processo
+_recursos = {}
+_lock_recursos = threading.RLock()
 
-try:
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    wait = WebDriverWait(driver, 30)
-    # Ajuste anti-detecção
-    driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-        "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                     'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
-    })
-    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-except Exception as e:
-    st.error("⚠️ Ocorreu um problema ao configurar o navegador automático. Verifique sua conexão com a internet ou tente novamente mais tarde.")
-    st.stop()
 
+def recurso_compartilhado(criar):
+    """
+    Cria o objeto uma vez por combinação de argumentos e depois o lê de um dicionário do módulo.
+
+    As threads das buscas não têm ScriptRunContext, e cada chamada delas ao st.cache_resource gera
+    um aviso; por isso o cache do Streamlit só é usado na thread do script da interface, onde
+    mantém o objeto entre as execuções. Na busca em lote o objeto é criado direto.
+    """
+    em_cache = st.cache_resource(criar)
 
-def buscar_jurisprudencias_unificadas(termos):
+    @functools.wraps(criar)
+    def obter(*args):
+        chave = (criar.__name__,) + args
+        recurso = _recursos.get(chave)
+        if recurso is None:
+            with _lock_recursos:
+                recurso = _recursos.get(chave)
+                if recurso is None:
+                    na_interface = get_script_run_ctx(suppress_warning=True) is not None
+                    recurso = em_cache(*args) if na_interface else criar(*args)
+                    _recursos[chave] = recurso
+        return recurso
 
-    resultados_unificados = pd.DataFrame()
+    return obter
 
-    for termo in termos:
 
-        st.write(f"> **BUSCA PELO TERMO {termo.upper()}**")
-
-        st.write("🔍 Buscando jurisprudência no TJSP...")
-        resultados_tjsp = buscar_jurisprudencia_tjsp(termo)
-        st.write("✅ Busca concluída no TJSP...")
-
-        st.write("🔍 Buscando jurisprudência no TJPR...")
-        resultados_tjpr = buscar_jurisprudencia_tjpr(termo)
-        st.write("✅ Busca concluída no TJPR...")
-
-        st.write("🔍 Buscando jurisprudência no TJDFT...")
-        resultados_tjdf = buscar_jurisprudencia_tjdf(termo)
-        st.write("✅ Busca concluída no TJDFT...")
-
-        st.write("🔍 Buscando jurisprudência no TJBA...")
-        resultados_tjba = buscar_jurisprudencia_tjba(termo)
-        st.write("✅ Busca concluída no TJBA...")
-
-        st.write("🔍 Buscando jurisprudência no TJAP...")
-        resultados_tjap = buscar_jurisprudencia_tjap(termo)
-        st.write("✅ Busca concluída no TJAP...")
-
-        resultados_unificados = pd.concat([resultados_tjsp, resultados_tjdf, resultados_tjba, resultados_tjap, resultados_tjpr, resultados_unificados], ignore_index=True)
-
-    # Agrupa pelo número do processo e junta os termos únicos
-    resultados_unificados = (
-        resultados_unificados
-        .groupby(['Número do Processo'], as_index=False)
-        .agg({
-            'Tribunal': 'first',
-            'Relator': 'first',
-            'Órgão Julgador': 'first',
-            'Data da Publicação': 'first',
-            'Ementa': 'first',
-            'Termos': lambda x: ', '.join(sorted(set(x)))
-        })
+# 🚗 Configuração do Selenium (Anti-detecção)
+def opcoes_chrome():
+    options = webdriver.ChromeOptions()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-popup-blocking")
+    options.add_argument("--disable-plugins-discovery")
+    options.add_argument("--incognito")
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument(
+        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
     )
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    return options
 
-    total_resultados = len(resultados_unificados)
 
-    # 💾 Criar nome do arquivo com data e hora
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    nome_arquivo = f"resultados_{timestamp}.xlsx"
-    caminho_arquivo = os.path.join("resultados", nome_arquivo)
+# 🧭 Caminho do chromedriver guardado em disco: o webdriver_manager consulta a internet a cada
+# install(), então ele só é chamado na primeira vez ou quando o driver guardado deixa de servir
+CAMINHO_CACHE_CHROMEDRIVER = os.path.join("cache", "chromedriver.json")
 
-    # Criar diretório se não existir
-    os.makedirs("resultados", exist_ok=True)
 
-    # Salvar arquivo local
-    resultados_unificados.to_excel(caminho_arquivo, index=False)
+def versao_chromedriver(caminho):
+    try:
+        saida = subprocess.run([caminho, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    linhas = saida.strip().splitlines()
+    return linhas[0] if linhas else None
 
-    # Limpar arquivos antigos da pasta (opcional: só os que começam com 'resultados_')
-    for arquivo in os.listdir("resultados"):
-        if arquivo.startswith("resultados_") and arquivo != nome_arquivo:
-            os.remove(os.path.join("resultados", arquivo))
 
-    # Criar buffer para download no Streamlit
-    buffer = io.BytesIO()
-    resultados_unificados.to_excel(buffer, index=False, engine='xlsxwriter')
-    buffer.seek(0)
+def resolver_chromedriver(forcar=False):
+    """
+    Caminho do chromedriver: o da variável CAMINHO_CHROMEDRIVER, o guardado em
+    `CAMINHO_CACHE_CHROMEDRIVER` (funciona sem internet) ou um novo obtido pelo webdriver_manager.
+    """
+    caminho = os.environ.get("CAMINHO_CHROMEDRIVER")
+    if caminho:
+        return caminho
 
-    st.download_button(
-        label=f"📥 Baixar resultados ({nome_arquivo})",
-        data=buffer,
-        file_name=nome_arquivo,
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    if not forcar:
+        try:
+            with open(CAMINHO_CACHE_CHROMEDRIVER, encoding="utf-8") as f:
+                caminho = json.load(f)["caminho"]
+            if os.access(caminho, os.X_OK):
+                return caminho
+        except (OSError, ValueError, KeyError):
+            pass
 
-    return resultados_unificados, total_resultados
+    with medir_inicializacao("chromedriver (webdriver_manager)"):
+        from webdriver_manager.chrome import ChromeDriverManager
+        caminho = ChromeDriverManager().install()
 
-def buscar_jurisprudencia_tjsp(termo):
-    global captcha_token
+    versao = versao_chromedriver(caminho)
+    os.makedirs(os.path.dirname(CAMINHO_CACHE_CHROMEDRIVER), exist_ok=True)
+    with open(CAMINHO_CACHE_CHROMEDRIVER, "w", encoding="utf-8") as f:
+        json.dump({"caminho": caminho, "versao": versao, "resolvido_em": datetime.now().isoformat(timespec="seconds")}, f)
+    print(f"🧭 chromedriver: {caminho} ({versao or 'versão desconhecida'})")
+    return caminho
 
-    # Sitekey do reCAPTCHA v3
-    SITE_KEY = "6LcXJIAbAAAAAOwprTGEEYwRSe-HMYD-Ys0pSR6f"
-    
-    # 🔎 URL do site do TJSP
-    URL_TJSP = "https://esaj.tjsp.jus.br/cjsg/consultaCompleta.do"
+# Quantidade de navegadores mantidos abertos e critérios de reciclagem
+TAMANHO_POOL_NAVEGADORES = 1
+MAX_NAVEGACOES_POR_NAVEGADOR = 200
+MAX_MEMORIA_NAVEGADOR_MB = 1500
 
-    # Se o token expirou, gerar um novo
-    if not captcha_token or time.time() > captcha_expiration_time:
-        resolver_captcha(URL_TJSP, SITE_KEY)
-    
-    pagina = 1
-    j = 1
-    while True:  # Tenta até conseguir acessar os dados
+
+class ErroNavegador(Exception):
+    """Falha ao iniciar o navegador automático."""
+
+
+def medir_memoria_navegador_mb(driver):
+    """
+    Soma a memória residente (RSS) do chromedriver e de todos os processos do Chrome abertos por ele.
+    Usa o /proc do Linux; em outros sistemas retorna 0 e a reciclagem por memória fica desativada.
+    """
+    try:
+        pids = [driver.service.process.pid]
+    except Exception:
+        return 0
+
+    total_kb = 0
+    while pids:
+        pid = pids.pop()
         try:
-            status.info(f"📌 Buscando por: {termo} no TJSP")
+            with open(f"/proc/{pid}/status") as f:
+                for linha in f:
+                    if linha.startswith("VmRSS:"):
+                        total_kb += int(linha.split()[1])
+                        break
+            with open(f"/proc/{pid}/task/{pid}/children") as f:
+                pids.extend(int(filho) for filho in f.read().split())
+        except (OSError, ValueError):
+            continue
 
-            
-            # 📌 1. Acessar a página do TJSP
+    return total_kb / 1024
+
+
+class PoolNavegadores:
+    """
+    Mantém navegadores Chrome abertos entre as execuções do script do Streamlit.
+
+    Os navegadores são criados sob demanda, verificados antes de cada uso e reciclados
+    depois de `max_navegacoes` páginas ou quando a memória passa de `max_memoria_mb`.
+    """
+
+    def __init__(self, tamanho, max_navegacoes, max_memoria_mb):
+        self.tamanho = tamanho
+        self.max_navegacoes = max_navegacoes
+        self.max_memoria_mb = max_memoria_mb
+        self._disponiveis = queue.Queue()
+        self._lock = threading.Lock()
+        self._criados = 0
+        self._navegacoes = {}
+        self._caminho_driver = None
+
+    def _iniciar_chrome(self):
+        from selenium.webdriver.chrome.service import Service
+
+        with medir_inicializacao("navegador"):
+            return webdriver.Chrome(service=Service(self._caminho_driver), options=opcoes_chrome())
+
+    def _criar(self):
+        from selenium.common.exceptions import SessionNotCreatedException
+
+        if not self._caminho_driver:
+            self._caminho_driver = resolver_chromedriver()
+
+        try:
+            driver = self._iniciar_chrome()
+        except SessionNotCreatedException:
+            # O Chrome foi atualizado e o driver guardado ficou incompatível: resolve de novo
+            self._caminho_driver = resolver_chromedriver(forcar=True)
+            driver = self._iniciar_chrome()
+        # Ajuste anti-detecção
+        driver.execute_cdp_cmd('Network.setUserAgentOverride', {
+            "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+                         'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
+        })
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        self._navegacoes[id(driver)] = 0
+        return driver
+
+    def _descartar(self, driver):
+        self._navegacoes.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self._lock:
+            self._criados -= 1
+
+    @staticmethod
+    def saudavel(driver):
+        try:
+            driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def _obter(self):
+        while True:
             try:
-                driver.get(URL_TJSP)
-            except Exception as e:
-                print(f"Erro ao carregar a página: {e}")
-                continue
+                driver = self._disponiveis.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    pode_criar = self._criados < self.tamanho
+                    if pode_criar:
+                        self._criados += 1
+                if pode_criar:
+                    try:
+                        return self._criar()
+                    except Exception as e:
+                        with self._lock:
+                            self._criados -= 1
+                        raise ErroNavegador(str(e)) from e
+                driver = self._disponiveis.get()
+
+            if self.saudavel(driver):
+                return driver
+            self._descartar(driver)
+
+    def _devolver(self, driver):
+        esgotado = self._navegacoes.get(id(driver), 0) >= self.max_navegacoes
+        pesado = medir_memoria_navegador_mb(driver) > self.max_memoria_mb
+        if esgotado or pesado or not self.saudavel(driver):
+            print(f"♻️ Reciclando navegador (navegações: {self._navegacoes.get(id(driver), 0)})")
+            self._descartar(driver)
+        else:
+            self._disponiveis.put(driver)
 
-            # 📌 2. Preencher o campo de pesquisa
-            search_box = wait.until(EC.presence_of_element_located((By.NAME, "dados.buscaInteiroTeor")))
-            search_box.clear()
-            search_box.send_keys(termo)
+    def registrar_navegacao(self, driver):
+        self._navegacoes[id(driver)] = self._navegacoes.get(id(driver), 0) + 1
 
-            # Inserir solução CAPTCHA na página
-            driver.execute_script(
-                "document.getElementById('id_recaptcha_response_token').value = arguments[0];",
-                captcha_token
-            )
-            # Injeta o token no campo correto e garante que ele exista no DOM
-            driver.execute_script("""
-                let responseField = document.getElementsByName('g-recaptcha-response')[0];
-                if (!responseField) {
-                    responseField = document.createElement('textarea');
-                    responseField.name = 'g-recaptcha-response';
-                    responseField.style.display = 'none';
-                    document.body.appendChild(responseField);
-                }
-                responseField.value = arguments[0];
-            """, captcha_token)
-            time.sleep(1)
+    @contextmanager
+    def navegador(self):
+        driver = self._obter()
+        try:
+            yield driver
+        finally:
+            self._devolver(driver)
 
-            # 📌 3. Submeter o formulário
-            pesquisar = wait.until(EC.element_to_be_clickable((By.NAME, "pbSubmit")))
-            driver.execute_script("arguments[0].click();", pesquisar)
-            time.sleep(2)
+    def encerrar(self):
+        while True:
+            try:
+                self._descartar(self._disponiveis.get_nowait())
+            except queue.Empty:
+                break
 
-            html = driver.page_source
-            with open("pagina_pos_submit.html", "w", encoding="utf-8") as f:
-                f.write(html)
 
-            # 📌 4. Extração de dados
-            resultados_finais = []
+@recurso_compartilhado
+def obter_pool_navegadores():
+    """Pool único por processo do servidor, compartilhado entre sessões e reruns."""
+    pool = PoolNavegadores(TAMANHO_POOL_NAVEGADORES, MAX_NAVEGACOES_POR_NAVEGADOR, MAX_MEMORIA_NAVEGADOR_MB)
+    atexit.register(pool.encerrar)
+    return pool
 
-            while True:
-                status.info(f"📄 Extraindo dados da página {pagina} do TJSP...")
 
-                time.sleep(5)
+class PainelStatus:
+    """
+    Encaminha as mensagens de progresso das buscas para o placeholder do Streamlit.
 
-                # Verifica se há linhas de resultado
-                linhas_resultado = driver.find_elements(By.CSS_SELECTOR, "tr.fundocinza1")
-                
-                if not linhas_resultado:
-                    status.info(f"⚠️ Nenhum resultado encontrado na página {pagina}. Encerrando busca no TJSP.")
-                    break
+    As buscas rodam em threads de trabalho, que não podem desenhar na tela diretamente;
+    elas apenas registram a última mensagem de cada thread, e a thread do script
+    redesenha o placeholder ao chamar `descarregar`.
+    """
 
-                soup = BeautifulSoup(driver.page_source, "html.parser")
-                processos = soup.find_all("tr", class_="fundocinza1")
+    def __init__(self, placeholder):
+        self.placeholder = placeholder
+        self._thread_dona = threading.get_ident()
+        self._lock = threading.Lock()
+        self._mensagens = {}
+        self._alterado = False
 
-                for processo in processos:
-                    status.info(f"✅ Pegando processo {j} do TJSP...")
-                    dados = {}
+    def info(self, mensagem):
+        self._registrar("info", mensagem)
 
-                    processo_link = processo.find("a", class_="esajLinkLogin downloadEmenta")
-                    if processo_link:
-                        dados["numero_processo"] = processo_link.text.strip()
-                        dados["cdacordao"] = processo_link.get("cdacordao", None)
+    def warning(self, mensagem):
+        self._registrar("warning", mensagem)
 
-                    if dados.get("cdacordao"):
-                        ementa_div = soup.find("div", id=f"textAreaDados_{dados['cdacordao']}")
-                        if ementa_div:
-                            dados["ementa_curta"] = ementa_div.text.strip().split("  (TJSP")[0]
+    def error(self, mensagem):
+        self._registrar("error", mensagem)
 
-                    for tr in processo.find_all("tr", class_="ementaClass2"):
-                        strong = tr.find("strong")
-                        if strong:
-                            chave = strong.text.strip().replace(":", "")
-                            valor = tr.get_text().strip().replace(strong.text.strip(), "").strip()
-                            if chave and valor:
-                                dados[chave] = valor
+    def success(self, mensagem):
+        self._registrar("success", mensagem)
 
-                    resultados_finais.append(dados)
-                    j += 1
+    def _registrar(self, nivel, mensagem):
+        with self._lock:
+            self._mensagens[threading.current_thread().name] = (nivel, mensagem)
+            self._alterado = True
+        if threading.get_ident() == self._thread_dona:
+            self.descarregar()
 
-                try:
-                    proxima_pagina = driver.find_elements(By.LINK_TEXT, ">")
-                    if proxima_pagina:
-                        proxima_pagina[0].click()
-                        time.sleep(3)
-                        status.info(f"Avançando para a próxima página no TJSP...")
-                        pagina += 1
-                    else:
-                        status.info(f"🔚 Última página alcançada no TJSP.")
-                        break
-                except:
-                    status.error(f"Erro ao consultar a página #{pagina} do TJSP")
+    def descarregar(self):
+        with self._lock:
+            if not self._alterado:
+                return
+            mensagens = list(self._mensagens.values())
+            self._alterado = False
+        with self.placeholder.container():
+            for nivel, mensagem in mensagens:
+                getattr(st, nivel)(mensagem)
+
+    def limpar(self):
+        with self._lock:
+            self._mensagens.clear()
+            self._alterado = False
+
+    def escrever(self, mensagem):
+        """Linha permanente no registro da busca (só na thread do script)."""
+        st.write(mensagem)
+
+
+class StatusConsole:
+    """Mesma interface do PainelStatus, mas escrevendo no terminal (execução em lote, sem Streamlit)."""
+
+    PREFIXOS = {"info": "", "warning": "[aviso] ", "error": "[erro] ", "success": ""}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def _registrar(self, nivel, mensagem):
+        with self._lock:
+            print(f"[{threading.current_thread().name}] {self.PREFIXOS[nivel]}{mensagem}", flush=True)
+
+    def info(self, mensagem):
+        self._registrar("info", mensagem)
+
+    def warning(self, mensagem):
+        self._registrar("warning", mensagem)
+
+    def error(self, mensagem):
+        self._registrar("error", mensagem)
+
+    def success(self, mensagem):
+        self._registrar("success", mensagem)
+
+    def descarregar(self):
+        pass
+
+    def limpar(self):
+        pass
+
+    def escrever(self, mensagem):
+        with self._lock:
+            print(mensagem, flush=True)
+
+
+# Trocado pelo PainelStatus quando a interface do Streamlit está rodando
+status = StatusConsole()
+
+
+# Parser HTML em C quando disponível (só verificado aqui; o bs4 importa o lxml quando usar)
+PARSER_HTML = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+# 🌐 Sessões HTTP reaproveitadas (keep-alive e pool de conexões por tribunal)
+TAMANHO_POOL_HTTP = 10
+TIMEOUT_HTTP = 60
+
+# Com o brotli instalado o urllib3 descomprime "br" (ele mesmo importa o módulo)
+ACEITA_COMPRESSAO = "gzip, deflate, br" if importlib.util.find_spec("brotli") else "gzip, deflate"
+
+CABECALHOS_PADRAO = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/html;q=0.9, */*;q=0.8",
+    "Accept-Encoding": ACEITA_COMPRESSAO,
+    "Accept-Language": "pt-BR,pt;q=0.9",
+    "Connection": "keep-alive",
+}
+
+
+@recurso_compartilhado
+def obter_sessao(tribunal):
+    """
+    Sessão HTTP compartilhada de um tribunal (ou do 2Captcha), criada uma vez por processo.
+    As conexões ficam abertas entre as páginas e entre as buscas.
+    """
+    sessao = requests.Session()
+    adaptador = requests.adapters.HTTPAdapter(pool_connections=TAMANHO_POOL_HTTP, pool_maxsize=TAMANHO_POOL_HTTP)
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    sessao.headers.update(CABECALHOS_PADRAO)
+    atexit.register(sessao.close)
+    return sessao
+
+
+# 🚦 Controle de tráfego por tribunal: a concorrência e o intervalo entre as requisições se ajustam
+# à latência e às respostas 429/5xx (AIMD), e as falhas temporárias são repetidas com backoff
+TRAFEGO_PADRAO = {
+    "concorrencia_inicial": 2,  # requisições simultâneas no início
+    "concorrencia_maxima": 8,
+    "intervalo_minimo": 0.0,  # segundos entre o início de duas requisições
+    "intervalo_maximo": 10.0,
+    "latencia_alvo": 15.0,  # respostas mais lentas que isso reduzem a concorrência
+    "tentativas": 5,
+    "espera_base": 1.0,  # backoff: espera_base * 2^tentativa, com jitter
+    "espera_maxima": 60.0,  # também o maior Retry-After aceito
+}
+TRAFEGO_TRIBUNAIS = {
+    "TJSP": {"concorrencia_inicial": 1, "concorrencia_maxima": 2, "intervalo_minimo": 0.5},
+    "TJDFT": {"concorrencia_maxima": 6},
+    "TJBA": {"concorrencia_maxima": 4, "latencia_alvo": 30.0},  # várias páginas por consulta
+    "TJPR": {"concorrencia_maxima": 8},
+    "TJAP": {"concorrencia_maxima": 2},
+}
+CODIGOS_REPETIR = {429, 500, 502, 503, 504}
+
+
+class ControladorTrafego:
+    """
+    Limita as requisições simultâneas a um tribunal e o intervalo entre o início delas.
+
+    A janela de concorrência cresce devagar (cerca de +1 a cada janela de respostas rápidas) e
+    cai pela metade quando o tribunal responde 429/5xx, falha a conexão ou fica mais lento que
+    `latencia_alvo`. Um 429 também dobra o intervalo, e um `Retry-After` pausa o tribunal inteiro.
+    """
+
+    def __init__(self, tribunal, concorrencia_inicial, concorrencia_maxima, intervalo_minimo, intervalo_maximo,
+                 latencia_alvo, tentativas, espera_base, espera_maxima):
+        self.tribunal = tribunal
+        self.concorrencia_maxima = concorrencia_maxima
+        self.intervalo_minimo = intervalo_minimo
+        self.intervalo_maximo = intervalo_maximo
+        self.latencia_alvo = latencia_alvo
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+
+        self.janela = float(concorrencia_inicial)
+        self.intervalo = intervalo_minimo
+        self.estatisticas = {"requisicoes": 0, "repetidas": 0, "perdidas": 0, "reducoes": 0}
+        self._condicao = threading.Condition()
+        self._em_andamento = 0
+        self._proximo_inicio = 0.0
+        self._pausado_ate = 0.0
+        self._ultima_reducao = 0.0
+        self._latencia_media = 0.0
+
+    @contextmanager
+    def vaga(self):
+        """Espera uma vaga na janela, o intervalo mínimo e o fim de uma pausa antes de requisitar."""
+        with self._condicao:
+            while True:
+                agora = time.monotonic()
+                liberado_em = max(self._proximo_inicio, self._pausado_ate)
+                if self._em_andamento >= int(self.janela):
+                    self._condicao.wait()
+                elif agora < liberado_em:
+                    self._condicao.wait(liberado_em - agora)
+                else:
                     break
+            self._em_andamento += 1
+            self._proximo_inicio = agora + self.intervalo
+            self.estatisticas["requisicoes"] += 1
+        try:
+            yield
+        finally:
+            with self._condicao:
+                self._em_andamento -= 1
+                self._condicao.notify_all()
+
+    def _reduzir(self):
+        # Uma redução por "rodada": as outras respostas da mesma rajada não cortam a janela de novo
+        agora = time.monotonic()
+        if agora - self._ultima_reducao < self._latencia_media:
+            return
+        self._ultima_reducao = agora
+        self.janela = max(1.0, self.janela / 2)
+        self.estatisticas["reducoes"] += 1
+
+    def registrar_sucesso(self, latencia):
+        with self._condicao:
+            self._latencia_media = latencia if not self._latencia_media else 0.8 * self._latencia_media + 0.2 * latencia
+            if latencia > self.latencia_alvo:
+                self._reduzir()
+            else:
+                self.janela = min(self.concorrencia_maxima, self.janela + 1 / self.janela)
+                self.intervalo = max(self.intervalo_minimo, self.intervalo * 0.9)
+            self._condicao.notify_all()
+
+    def registrar_falha(self, codigo, retry_after=None):
+        with self._condicao:
+            self._reduzir()
+            if codigo == 429:
+                self.intervalo = min(self.intervalo_maximo, max(self.intervalo * 2, 0.1))
+            if retry_after:
+                self._pausado_ate = max(self._pausado_ate, time.monotonic() + retry_after)
+
+    def registrar_tentativa(self, perdida=False):
+        with self._condicao:
+            self.estatisticas["perdidas" if perdida else "repetidas"] += 1
+
+    def espera(self, tentativa):
+        """Backoff exponencial com jitter: metade fixa e metade sorteada, para as threads não voltarem juntas."""
+        teto = min(self.espera_maxima, self.espera_base * 2 ** tentativa)
+        return teto / 2 + random.uniform(0, teto / 2)
+
+
+@recurso_compartilhado
+def obter_controlador_trafego(tribunal):
+    """Controlador de tráfego de um tribunal, mantido entre as buscas para não reaprender os limites."""
+    return ControladorTrafego(tribunal, **{**TRAFEGO_PADRAO, **TRAFEGO_TRIBUNAIS.get(tribunal, {})})
+
+
+def ler_retry_after(response):
+    """Segundos pedidos no cabeçalho Retry-After (número ou data HTTP), ou None."""
+    valor = response.headers.get("Retry-After") if response is not None else None
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (data - datetime.now(data.tzinfo)).total_seconds())
+
+
+def requisitar(tribunal, metodo, url, sessao=None, **kwargs):
+    """
+    Requisição a um tribunal passando pelo controlador de tráfego dele.
+
+    Respostas 429/5xx e falhas de conexão são repetidas com backoff (ou depois do Retry-After).
+    Esgotadas as tentativas, devolve a última resposta ou levanta o último erro, como a sessão
+    faria, e a requisição perdida é informada no status e contada no resumo da busca.
+    """
+    controlador = obter_controlador_trafego(tribunal)
+    sessao = sessao or obter_sessao(tribunal)
+    kwargs.setdefault("timeout", TIMEOUT_HTTP)
+
+    for tentativa in range(controlador.tentativas):
+        erro = None
+        with controlador.vaga():
+            inicio = time.monotonic()
             try:
-                return processar_resultados_tjsp(resultados_finais, termo)
-            except:
-                status.error(f"Erro ao extrair resultados do TJSP")
-                break
+                response = sessao.request(metodo, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                response, erro = None, e
+            latencia = time.monotonic() - inicio
+
+        if response is not None and response.status_code not in CODIGOS_REPETIR:
+            controlador.registrar_sucesso(latencia)
+            return response
+
+        retry_after = ler_retry_after(response)
+        controlador.registrar_falha(response.status_code if response is not None else None, retry_after)
+        descricao = f"HTTP {response.status_code}" if response is not None else type(erro).__name__
+        if tentativa + 1 == controlador.tentativas or (retry_after or 0) > controlador.espera_maxima:
+            break
+
+        controlador.registrar_tentativa()
+        espera = retry_after if retry_after is not None else controlador.espera(tentativa)
+        status.warning(f"🚦 {tribunal} respondeu {descricao}; nova tentativa em {espera:.1f}s ({tentativa + 2}/{controlador.tentativas})")
+        time.sleep(espera)
+
+    controlador.registrar_tentativa(perdida=True)
+    status.error(f"🚦 {tribunal} respondeu {descricao} depois de {tentativa + 1} tentativa(s); requisição perdida")
+    if response is None:
+        raise erro
+    return response
+
+
+def resumo_trafego(tribunal, antes):
+    """Uma linha com o tráfego de um tribunal desde o instantâneo `antes` das estatísticas."""
+    controlador = obter_controlador_trafego(tribunal)
+    dados = {chave: valor - antes.get(chave, 0) for chave, valor in controlador.estatisticas.items()}
+    alerta = "⚠️ resultados possivelmente incompletos, " if dados["perdidas"] else ""
+    return (
+        f"🚦 {tribunal}: {alerta}{dados['requisicoes']} requisições, {dados['repetidas']} repetidas, "
+        f"{dados['perdidas']} perdidas; concorrência {controlador.janela:.1f}, intervalo {controlador.intervalo:.2f}s"
+    )
 
-        except Exception as e:
-            status.info(f"⚠️ Erro ao acessar os dados ({e}), tentando novamente em 5s...")
-            time.sleep(5)
-            resolver_captcha(URL_TJSP, SITE_KEY)  # Gera um novo CAPTCHA antes de tentar novamente
 
-def buscar_jurisprudencia_tjba(termo):
-    url = "https://jurisprudenciaws.tjba.jus.br/graphql"
-    headers = {"Content-Type": "application/json"}
-    
-    pagina = 0
-    resultados_completos = pd.DataFrame()
+# 💾 Cache local das respostas dos tribunais
+CAMINHO_CACHE = os.path.join("cache", "respostas.sqlite3")
+CACHE_TTL_SEGUNDOS = 12 * 60 * 60
+CACHE_TAMANHO_MAX_MB = 500
 
-    status.info(f"📌 Buscando por: {termo} no TJBA")
+# Desligado pela interface para forçar uma nova consulta (as respostas novas continuam sendo gravadas)
+usar_cache = True
 
-    while True:  # Continua até não haver mais resultados
-        payload = {
-            "operationName": "filter",
-            "variables": {
-                "decisaoFilter": {
-                    "assunto": termo,
-                    "ordenadoPor": "dataPublicacao"
-                },
-                "pageNumber": pagina,
-                "itemsPerPage": 10
-            },
-            "query": """query filter($decisaoFilter: DecisaoFilter!, $pageNumber: Int!, $itemsPerPage: Int!) {
-                filter(decisaoFilter: $decisaoFilter, pageNumber: $pageNumber, itemsPerPage: $itemsPerPage) {
-                    decisoes {
-                        dataPublicacao
-                        relator { nome }
-                        orgaoJulgador { nome }
-                        classe { descricao }
-                        conteudo
-                        hash
-                        numeroProcesso
-                    }
-                    pageCount
-                    itemCount
-                }
-            }"""
-        }
 
-        try:
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            json_result = response.json()
+class CacheRespostas:
+    """
+    Cache em SQLite das respostas brutas, por (tribunal, termo, página, parâmetros da consulta).
 
-            # Verificação de erro na resposta
-            if not json_result or "data" not in json_result or not isinstance(json_result["data"], dict):
-                status.error(f"❌ Resposta inesperada da API na página do TJBA {pagina}: {json_result}")
-                break  # Interrompe a busca se a resposta for inválida
+    As entradas expiram depois de `ttl` segundos, e quando o arquivo passa de
+    `tamanho_max_bytes` as entradas acessadas há mais tempo são removidas.
+    """
 
-            # Extrai os dados relevantes
-            filter_data = json_result["data"].get("filter", {})
-            decisoes = filter_data.get("decisoes", [])
+    VERIFICAR_TAMANHO_A_CADA = 50
+
+    def __init__(self, caminho, ttl, tamanho_max_bytes):
+        self.caminho = caminho
+        self.ttl = ttl
+        self.tamanho_max_bytes = tamanho_max_bytes
+        self._local = threading.local()
+        self._gravacoes = 0
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with self._conexao() as conexao:
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS respostas (
+                    chave TEXT PRIMARY KEY,
+                    tribunal TEXT NOT NULL,
+                    termo TEXT NOT NULL,
+                    pagina INTEGER NOT NULL,
+                    valor TEXT NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    criado_em REAL NOT NULL,
+                    acessado_em REAL NOT NULL
+                )
+            """)
+            conexao.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas (acessado_em)")
+
+    def _conexao(self):
+        # Uma conexão por thread, já que as buscas rodam em paralelo
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=30)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    @staticmethod
+    def chave(tribunal, termo, pagina, parametros=None):
+        bruto = json.dumps([tribunal, termo, pagina, parametros], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+    def obter(self, tribunal, termo, pagina, parametros=None):
+        chave = self.chave(tribunal, termo, pagina, parametros)
+        agora = time.time()
+        with self._conexao() as conexao:
+            linha = conexao.execute(
+                "SELECT valor, criado_em FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha is None:
+                return None
+            valor, criado_em = linha
+            if agora - criado_em > self.ttl:
+                conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                return None
+            conexao.execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+        return valor
+
+    def guardar(self, tribunal, termo, pagina, valor, parametros=None):
+        chave = self.chave(tribunal, termo, pagina, parametros)
+        agora = time.time()
+        with self._conexao() as conexao:
+            conexao.execute(
+                "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (chave, tribunal, termo, pagina, valor, len(valor.encode("utf-8")), agora, agora)
+            )
+        self._gravacoes += 1
+        if self._gravacoes % self.VERIFICAR_TAMANHO_A_CADA == 0:
+            self.limitar_tamanho()
+
+    def limitar_tamanho(self):
+        with self._conexao() as conexao:
+            conexao.execute("DELETE FROM respostas WHERE criado_em < ?", (time.time() - self.ttl,))
+            total = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+            if total <= self.tamanho_max_bytes:
+                return
+            # Remove as entradas menos usadas recentemente até caber no limite
+            excedente = total - self.tamanho_max_bytes
+            removido = 0
+            chaves = []
+            for chave, tamanho in conexao.execute("SELECT chave, tamanho FROM respostas ORDER BY acessado_em"):
+                chaves.append((chave,))
+                removido += tamanho
+                if removido >= excedente:
+                    break
+            conexao.executemany("DELETE FROM respostas WHERE chave = ?", chaves)
 
-            if not decisoes:  # Se a API não retornar mais decisões, finaliza a busca
-                status.info(f"✅ Nenhuma decisão encontrada na página {pagina}. Finalizando paginação no TJBA.")
-                break
 
-            # Processa os dados
-            pagina_df = processar_resultados_tjba(decisoes, filter_data.get("itemCount", 0), filter_data.get("pageCount", 0), termo)
-            resultados_completos = pd.concat([resultados_completos, pagina_df], ignore_index=True)
+@recurso_compartilhado
+def obter_cache_respostas():
+    return CacheRespostas(CAMINHO_CACHE, CACHE_TTL_SEGUNDOS, CACHE_TAMANHO_MAX_MB * 1024 * 1024)
 
-            # Avança para a próxima página
-            pagina += 1
 
-            status.info(f"Processada a página #{pagina} do TJBA")
+def ler_cache(tribunal, termo, pagina, parametros=None):
+    if not usar_cache:
+        return None
+    return obter_cache_respostas().obter(tribunal, termo, pagina, parametros)
 
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Erro ao acessar a API do TJBA: {e}")
-            break  # Evita loop infinito em caso de erro
 
-    return resultados_completos
+def gravar_cache(tribunal, termo, pagina, valor, parametros=None):
+    obter_cache_respostas().guardar(tribunal, termo, pagina, valor, parametros)
 
-def buscar_jurisprudencia_tjdf(termo):
-    pagina = 0
-    resultados_completos = pd.DataFrame()
-    total_hits = 0
 
-    status.info(f"📌 Buscando por: {termo} no TJDFT")
+# 🔁 Histórico das decisões já coletadas, usado na atualização incremental
+CAMINHO_HISTORICO = os.path.join("resultados", "historico.sqlite3")
 
-    try:
-        json_result, total_hits = consultar_resultados_tjdf_por_pagina(termo, pagina)
-        if not json_result:
-            return resultados_completos
-
-        while len(resultados_completos) < total_hits:
-            json_result, _ = consultar_resultados_tjdf_por_pagina(termo, pagina)
-            if json_result:
-                pagina_df = processar_resultados_tjdf(json_result, termo)
-                resultados_completos = pd.concat([resultados_completos, pagina_df], ignore_index=True)
-                pagina += 1
-                status.info(f"Processada a página #{pagina} do TJDFT")
+# Ligado pela interface: a paginação para na primeira página sem decisões novas
+modo_incremental = False
+
+
+class HistoricoDecisoes:
+    """
+    Guarda, por (tribunal, termo), as decisões já coletadas e a data de publicação mais recente.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with self._conexao() as conexao:
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS decisoes (
+                    tribunal TEXT NOT NULL,
+                    termo TEXT NOT NULL,
+                    numero_processo TEXT NOT NULL,
+                    registro TEXT NOT NULL,
+                    PRIMARY KEY (tribunal, termo, numero_processo)
+                )
+            """)
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS estado (
+                    tribunal TEXT NOT NULL,
+                    termo TEXT NOT NULL,
+                    data_mais_recente TEXT,
+                    atualizado_em REAL NOT NULL,
+                    PRIMARY KEY (tribunal, termo)
+                )
+            """)
+
+    def _conexao(self):
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=30)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def conhecidos(self, tribunal, termo):
+        linhas = self._conexao().execute(
+            "SELECT numero_processo FROM decisoes WHERE tribunal = ? AND termo = ?", (tribunal, termo)
+        )
+        return {numero for (numero,) in linhas}
+
+    def data_mais_recente(self, tribunal, termo):
+        linha = self._conexao().execute(
+            "SELECT data_mais_recente FROM estado WHERE tribunal = ? AND termo = ?", (tribunal, termo)
+        ).fetchone()
+        return linha[0] if linha else None
+
+    def registrar(self, tribunal, termo, resultados):
+        """Grava as decisões novas ou atualizadas de uma coleta."""
+        if resultados is not None and not resultados.empty:
+            registros = resultados.to_dict("records")
+            datas = pd.to_datetime(resultados["Data da Publicação"], errors="coerce", dayfirst=True, format="mixed")
+            mais_recente = datas.max()
+            anterior = self.data_mais_recente(tribunal, termo)
+            if pd.notna(mais_recente):
+                mais_recente = mais_recente.strftime("%Y-%m-%d")
+                if anterior and anterior > mais_recente:
+                    mais_recente = anterior
             else:
-                break
+                mais_recente = anterior
+            with self._conexao() as conexao:
+                conexao.executemany(
+                    "INSERT OR REPLACE INTO decisoes VALUES (?, ?, ?, ?)",
+                    [
+                        (tribunal, termo, str(registro["Número do Processo"]), json.dumps(registro, ensure_ascii=False, default=str))
+                        for registro in registros
+                    ]
+                )
+                conexao.execute(
+                    "INSERT OR REPLACE INTO estado VALUES (?, ?, ?, ?)", (tribunal, termo, mais_recente, time.time())
+                )
 
-    except Exception as e:
-        status.error(f"Erro ao buscar TJDFT: {e}")
+    def carregar(self, tribunal, termo):
+        """Todas as decisões guardadas do (tribunal, termo)."""
+        linhas = self._conexao().execute(
+            "SELECT registro FROM decisoes WHERE tribunal = ? AND termo = ?", (tribunal, termo)
+        )
+        return pd.DataFrame.from_records([json.loads(registro) for (registro,) in linhas], columns=COLUNAS_RESULTADO)
 
-    return resultados_completos
 
-    # Função para consultar resultados na API do TJDFT
+@recurso_compartilhado
+def obter_historico_decisoes():
+    return HistoricoDecisoes(CAMINHO_HISTORICO)
 
-def buscar_jurisprudencia_tjpr(termo):
-    pagina = 1
-    resultados_completos = pd.DataFrame()
-    total_hits = 0
 
-    status.info(f"📌 Buscando por: {termo} no TJPR")
+def pagina_ja_conhecida(pagina_df, conhecidos):
+    """Verdadeiro quando todas as decisões da página já estavam no histórico."""
+    if not conhecidos or pagina_df is None or pagina_df.empty:
+        return False
+    return pagina_df["Número do Processo"].astype(str).isin(conhecidos).all()
+
+
+def um_termo_por_linha(resultados):
+    """Repete cada decisão para cada termo de `Termos` ("a, b" vira uma linha com "a" e outra com "b")."""
+    if resultados.empty:
+        return resultados
+    return resultados.assign(Termos=resultados["Termos"].astype(str).str.split(", ")).explode("Termos", ignore_index=True)
+
+
+def so_do_termo(resultados, termo):
+    """Decisões em que `termo` está entre os `Termos`."""
+    if resultados.empty:
+        return resultados
+    return resultados[resultados["Termos"].astype(str).str.contains(rf"(?:^|, ){re.escape(termo)}(?:,|$)")]
+
+
+# 📚 Acervo com os resultados de todas as buscas já feitas
+CAMINHO_ACERVO = os.path.join("resultados", "acervo")
+
+
+class AcervoResultados:
+    """
+    Guarda os resultados de cada busca em Parquet, particionado por tribunal e dia da coleta.
+
+    Cada busca grava arquivos novos (nada é apagado ou reescrito), e as consultas por termo,
+    tribunal e período leem só as partições e colunas necessárias.
+    """
+
+    COLUNAS_COLETA = ["Coletado em", "Data da Coleta"]
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._particoes = None
+        # Lista de termos já calculada; descartada a cada `adicionar`
+        self._termos = None
+
+    @property
+    def particoes(self):
+        # Montado no primeiro uso, para o pyarrow não ser importado junto com o módulo
+        if self._particoes is None:
+            self._particoes = ds.partitioning(
+                pa.schema([("Tribunal", pa.string()), ("Data da Coleta", pa.string())]), flavor="hive"
+            )
+        return self._particoes
+
+    def adicionar(self, resultados, coletado_em):
+        """Acrescenta os resultados (antes da unificação) de uma busca feita em `coletado_em`."""
+        if resultados is None or resultados.empty:
+            return
+        # Uma linha por termo (as consultas combinadas trazem "a, b"), para o filtro por termo ser exato.
+        # Tudo como texto, para os arquivos de buscas diferentes terem o mesmo esquema
+        tabela = um_termo_por_linha(resultados.reindex(columns=COLUNAS_RESULTADO)).astype("string")
+        tabela["Coletado em"] = coletado_em.isoformat(timespec="seconds")
+        tabela["Data da Coleta"] = coletado_em.strftime("%Y-%m-%d")
+        with self._lock:
+            pq.write_to_dataset(
+                pa.Table.from_pandas(tabela, preserve_index=False),
+                self.caminho,
+                partitioning=self.particoes,
+                basename_template=f"coleta_{coletado_em.strftime('%Y-%m-%d_%H-%M-%S')}_{uuid.uuid4().hex[:8]}_{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+            self._termos = None
+
+    def _dataset(self):
+        if not os.path.isdir(self.caminho):
+            return None
+        return ds.dataset(self.caminho, format="parquet", partitioning=self.particoes)
+
+    def consultar(self, termos=None, tribunais=None, inicio=None, fim=None):
+        """Resultados guardados, filtrados por termos, tribunais e período da coleta (datas, inclusive)."""
+        dataset = self._dataset()
+        if dataset is None:
+            return pd.DataFrame(columns=COLUNAS_RESULTADO + self.COLUNAS_COLETA)
+
+        filtros = []
+        if tribunais:
+            filtros.append(ds.field("Tribunal").isin(list(tribunais)))
+        if inicio:
+            filtros.append(ds.field("Data da Coleta") >= inicio.strftime("%Y-%m-%d"))
+        if fim:
+            filtros.append(ds.field("Data da Coleta") <= fim.strftime("%Y-%m-%d"))
+        if termos:
+            # Também acha os termos dentro de "a, b", como gravado antes de uma linha por termo
+            alternativas = "|".join(re.escape(termo) for termo in termos)
+            filtros.append(pc.match_substring_regex(ds.field("Termos"), f"(?:^|, )(?:{alternativas})(?:,|$)"))
+        filtro = None
+        for condicao in filtros:
+            filtro = condicao if filtro is None else filtro & condicao
+
+        return dataset.to_table(filter=filtro).to_pandas().reindex(columns=COLUNAS_RESULTADO + self.COLUNAS_COLETA)
+
+    def termos(self):
+        """Termos que já têm resultados guardados (lidos do disco só depois de uma nova coleta)."""
+        with self._lock:
+            if self._termos is None:
+                dataset = self._dataset()
+                if dataset is None:
+                    return []
+                textos = pc.unique(dataset.to_table(columns=["Termos"])["Termos"]).drop_null().to_pylist()
+                self._termos = sorted({termo for texto in textos for termo in texto.split(", ")})
+            return list(self._termos)
+
+
+@recurso_compartilhado
+def obter_acervo():
+    return AcervoResultados(CAMINHO_ACERVO)
+
+
+# 🔎 Índice de texto completo (SQLite FTS5) das ementas já coletadas
+CAMINHO_INDICE_EMENTAS = os.path.join("resultados", "ementas.sqlite3")
+
+# Marcadores do trecho destacado; trocados por <mark> depois de escapar o HTML
+INICIO_DESTAQUE = "\x02"
+FIM_DESTAQUE = "\x03"
+
+
+def montar_consulta_fts(texto):
+    """
+    Converte o texto digitado em uma consulta FTS5 segura: cada palavra vira um termo entre aspas
+    (todas precisam aparecer) e um `*` no fim da palavra busca pelo prefixo.
+    """
+    termos = []
+    for palavra in re.findall(r"[\w*]+", texto):
+        prefixo = palavra.endswith("*")
+        palavra = palavra.strip("*")
+        if palavra:
+            termos.append(f'"{palavra}"' + ("*" if prefixo else ""))
+    return " ".join(termos)
+
 
+class IndiceEmentas:
+    """
+    Índice FTS5 das ementas de todas as coletas, uma linha por (tribunal, número do processo).
+
+    Decisões já indexadas só têm os termos acrescentados; o texto é reindexado apenas quando
+    a ementa muda. Acentos são ignorados na busca ("homoafetiva" encontra "HOMOAFETIVA").
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with self._conexao() as conexao:
+            conexao.executescript("""
+                CREATE TABLE IF NOT EXISTS decisoes (
+                    id INTEGER PRIMARY KEY,
+                    tribunal TEXT NOT NULL,
+                    numero_processo TEXT NOT NULL,
+                    termos TEXT NOT NULL,
+                    relator TEXT,
+                    orgao_julgador TEXT,
+                    data_publicacao TEXT,
+                    ementa TEXT,
+                    UNIQUE (tribunal, numero_processo)
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS decisoes_fts USING fts5(
+                    ementa, content='decisoes', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS decisoes_ai AFTER INSERT ON decisoes BEGIN
+                    INSERT INTO decisoes_fts(rowid, ementa) VALUES (new.id, new.ementa);
+                END;
+                CREATE TRIGGER IF NOT EXISTS decisoes_ad AFTER DELETE ON decisoes BEGIN
+                    INSERT INTO decisoes_fts(decisoes_fts, rowid, ementa) VALUES ('delete', old.id, old.ementa);
+                END;
+                -- Recriado para os índices antigos: só reindexa quando o texto da ementa muda de fato
+                -- (o upsert sempre lista `ementa` no SET, o que dispara o UPDATE OF mesmo sem mudança)
+                DROP TRIGGER IF EXISTS decisoes_au;
+                CREATE TRIGGER decisoes_au AFTER UPDATE OF ementa ON decisoes
+                WHEN old.ementa IS NOT new.ementa BEGIN
+                    INSERT INTO decisoes_fts(decisoes_fts, rowid, ementa) VALUES ('delete', old.id, old.ementa);
+                    INSERT INTO decisoes_fts(rowid, ementa) VALUES (new.id, new.ementa);
+                END;
+            """)
+
+    def _conexao(self):
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=30)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def vazio(self):
+        return self._conexao().execute("SELECT NOT EXISTS (SELECT 1 FROM decisoes)").fetchone()[0]
+
+    def indexar(self, resultados):
+        """Acrescenta ao índice os resultados de uma coleta (antes da unificação)."""
+        if resultados is None or resultados.empty:
+            return
+        colunas = ["Tribunal", "Número do Processo", "Termos", "Relator", "Órgão Julgador", "Data da Publicação", "Ementa"]
+        linhas = (
+            tuple(None if pd.isna(valor) else str(valor) for valor in linha)
+            for linha in resultados.reindex(columns=colunas).itertuples(index=False, name=None)
+        )
+        with self._conexao() as conexao:
+            conexao.executemany("""
+                INSERT INTO decisoes (tribunal, numero_processo, termos, relator, orgao_julgador, data_publicacao, ementa)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (tribunal, numero_processo) DO UPDATE SET
+                    termos = CASE
+                        WHEN instr(', ' || termos || ', ', ', ' || excluded.termos || ', ') THEN termos
+                        ELSE termos || ', ' || excluded.termos
+                    END,
+                    ementa = excluded.ementa
+                WHERE excluded.ementa IS NOT decisoes.ementa
+                    OR NOT instr(', ' || termos || ', ', ', ' || excluded.termos || ', ')
+            """, (linha for linha in linhas if linha[1] and linha[2]))
+
+    def buscar(self, texto, termos=None, tribunais=None, limite=200):
+        """
+        Busca no texto das ementas, ordenando pela relevância (BM25). `termos` restringe às
+        decisões coletadas por algum desses termos, para refinar uma busca já feita.
+        """
+        consulta = montar_consulta_fts(texto)
+        if not consulta:
+            return pd.DataFrame()
+
+        sql = f"""
+            SELECT d.tribunal AS "Tribunal", d.termos AS "Termos", d.numero_processo AS "Número do Processo",
+                   d.relator AS "Relator", d.orgao_julgador AS "Órgão Julgador",
+                   d.data_publicacao AS "Data da Publicação",
+                   snippet(decisoes_fts, 0, '{INICIO_DESTAQUE}', '{FIM_DESTAQUE}', ' … ', 32) AS "Trecho",
+                   d.ementa AS "Ementa"
+            FROM decisoes_fts JOIN decisoes d ON d.id = decisoes_fts.rowid
+            WHERE decisoes_fts MATCH ?
+        """
+        parametros = [consulta]
+        if tribunais:
+            sql += f" AND d.tribunal IN ({', '.join('?' * len(tribunais))})"
+            parametros.extend(tribunais)
+        if termos:
+            sql += " AND (" + " OR ".join(["instr(', ' || d.termos || ', ', ', ' || ? || ', ')"] * len(termos)) + ")"
+            parametros.extend(termos)
+        sql += " ORDER BY rank LIMIT ?"
+        parametros.append(limite)
+        return pd.read_sql_query(sql, self._conexao(), params=parametros)
+
+
+def trecho_destacado(trecho):
+    """HTML do trecho devolvido pelo FTS5, com as palavras encontradas em <mark>."""
+    return html.escape(trecho).replace(INICIO_DESTAQUE, "<mark>").replace(FIM_DESTAQUE, "</mark>")
+
+
+@recurso_compartilhado
+def obter_indice_ementas():
+    indice = IndiceEmentas(CAMINHO_INDICE_EMENTAS)
+    # Na primeira vez, o índice é montado com o que já está no acervo
+    if indice.vazio():
+        indice.indexar(obter_acervo().consultar())
+    return indice
+
+
+# Número máximo de páginas de um mesmo termo baixadas ao mesmo tempo
+PARALELISMO_PAGINAS = 4
+
+
+def buscar_paginas_em_paralelo(consultar_pagina, paginas, max_paralelo=PARALELISMO_PAGINAS):
+    """
+    Consulta várias páginas ao mesmo tempo e devolve `(pagina, resultado)` na ordem das páginas.
+    Se o consumidor interromper a iteração, as páginas ainda não iniciadas são canceladas.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_paralelo, thread_name_prefix=f"{threading.current_thread().name}-paginas")
     try:
-        # Primeira consulta para obter o total de registros
-        html, total_hits = consultar_resultados_tjpr_por_pagina(termo, pagina)
-        if not html or total_hits == 0:
-            return resultados_completos
-        while len(resultados_completos) < total_hits:
-            html, _ = consultar_resultados_tjpr_por_pagina(termo, pagina)
-            if html:
-                pagina_df = processar_resultados_tjpr(html, termo)
-                resultados_completos = pd.concat([resultados_completos, pagina_df], ignore_index=True)
-                status.info(f"Processada a página #{pagina} do TJPR")
-                pagina += 1
-            else:
-                break
+        futuros = [(pagina, executor.submit(consultar_pagina, pagina)) for pagina in paginas]
+        for pagina, futuro in futuros:
+            yield pagina, futuro.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
 
-    except Exception as e:
-        status.error(f"Erro ao buscar TJPR: {e}")
 
-    return resultados_completos
+# Colunas comuns aos resultados de todos os tribunais
+COLUNAS_RESULTADO = ["Tribunal", "Termos", "Número do Processo", "Relator", "Órgão Julgador", "Data da Publicação", "Ementa"]
 
-def buscar_jurisprudencia_tjap(termo):
-    url = "https://tucujuris.tjap.jus.br/api/publico/consultar-jurisprudencia"
-    headers = {"Content-Type": "application/json"}
-    payload = {"ementa": termo}
 
-    status.info(f"📌 Buscando por: {termo} no TJAP")
+class AcumuladorResultados:
+    """
+    Junta as páginas de resultados de uma busca sem copiar o que já foi acumulado.
 
-    response = requests.post(url, headers=headers, json=payload)
-    return processar_resultados_tjap(response.json() if response.status_code == 200 else {"error": "Falha na requisição"}, termo)
+    Cada página é guardada como está (DataFrame ou lista de registros) e o DataFrame
+    final é montado uma única vez em `para_dataframe`, em vez de um `pd.concat` por página.
+    """
 
-def processar_resultados_tjsp(decisoes, termo):
-    resultados = []
-    for decisao in decisoes:
-        resultados.append({
-            "Tribunal": "TJSP",
-            "Termos": termo,
-            "Número do Processo": decisao.get("numero_processo", "N/A"),
-            "Relator": decisao.get("Relator(a)", "N/A"),
-            "Órgão Julgador": decisao.get("Órgão julgador", "N/A"),
-            "Data da Publicação": decisao.get("Data de publicação", "N/A"),
-            "Ementa": decisao.get("Ementa", "N/A"),
+    def __init__(self, transmitir=False):
+        self._blocos = []
+        self._total = 0
+        # Nas buscas dos tribunais, cada página também vai para a tela assim que chega
+        self.transmitir = transmitir
+
+    def adicionar(self, pagina):
+        if pagina is None:
+            return
+        if isinstance(pagina, pd.DataFrame):
+            if pagina.empty:
+                return
+            self._blocos.append(pagina)
+        else:
+            pagina = list(pagina)
+            if not pagina:
+                return
+            self._blocos.append(pd.DataFrame.from_records(pagina))
+        self._total += len(self._blocos[-1])
+        if self.transmitir:
+            transmitir_resultados(self._blocos[-1])
+
+    def __len__(self):
+        return self._total
+
+    def para_dataframe(self):
+        if not self._blocos:
+            return pd.DataFrame(columns=COLUNAS_RESULTADO)
+        if len(self._blocos) == 1:
+            return self._blocos[0].reset_index(drop=True)
+        return pd.concat(self._blocos, ignore_index=True)
+
+
+def grafico_por_tribunal(contagem, titulo='Distribuição de Resultados por Tribunal'):
+    """Gráfico de barras com Plotly a partir de uma Series {tribunal: quantidade}."""
+    contagem_tribunais = contagem.sort_values().reset_index()
+    contagem_tribunais.columns = ['Tribunal', 'Número de Resultados']
+
+    fig = px.bar(contagem_tribunais, x='Tribunal', y='Número de Resultados', text='Número de Resultados',
+                 title=titulo)
+
+    fig.update_traces(texttemplate='%{text}', textposition='outside')
+    fig.update_layout(uniformtext_minsize=12, uniformtext_mode='hide', xaxis_title='Tribunal', yaxis_title='Número de Resultados',
+                      xaxis_showgrid=False, yaxis_showgrid=False, font=dict(size=12))  # Aumenta o tamanho da fonte
+    return fig
+
+
+# 📡 Resultados parciais mostrados enquanto as buscas ainda estão rodando
+INTERVALO_ATUALIZACAO_PARCIAL = 1.0  # segundos entre dois redesenhos
+LINHAS_TABELA_PARCIAL = 500  # só as decisões mais recentes vão para a tabela parcial
+
+
+class TransmissaoResultados:
+    """
+    Mostra as decisões conforme cada página é processada, sem esperar todos os tribunais.
+
+    As threads de trabalho só registram as páginas (`adicionar`); a thread do script
+    redesenha contagens, gráfico e tabela em `descarregar`, no máximo uma vez a cada
+    `intervalo` segundos, para que a tela não vire o gargalo da busca.
+    """
+
+    def __init__(self, placeholder, intervalo=INTERVALO_ATUALIZACAO_PARCIAL, max_linhas=LINHAS_TABELA_PARCIAL):
+        self.placeholder = placeholder
+        self.intervalo = intervalo
+        self.max_linhas = max_linhas
+        self._lock = threading.Lock()
+        self._contagem = {}
+        self._recentes = deque()
+        self._linhas_recentes = 0
+        self._alterado = False
+        self._ultimo_desenho = 0
+        self._desenhos = 0
+        self.inicio = time.perf_counter()
+        self.primeiro_resultado = None
+
+    def adicionar(self, pagina):
+        if pagina is None or pagina.empty:
+            return
+        contagem = pagina["Tribunal"].value_counts()
+        with self._lock:
+            if self.primeiro_resultado is None:
+                self.primeiro_resultado = time.perf_counter() - self.inicio
+            for tribunal, quantidade in contagem.items():
+                self._contagem[tribunal] = self._contagem.get(tribunal, 0) + int(quantidade)
+            self._recentes.append(pagina)
+            self._linhas_recentes += len(pagina)
+            # Descarta páginas antigas que já não cabem na tabela parcial
+            while self._linhas_recentes - len(self._recentes[0]) >= self.max_linhas:
+                self._linhas_recentes -= len(self._recentes.popleft())
+            self._alterado = True
+
+    def descarregar(self):
+        agora = time.perf_counter()
+        with self._lock:
+            if not self._alterado or agora - self._ultimo_desenho < self.intervalo:
+                return
+            contagem = pd.Series(self._contagem, dtype="int64")
+            recentes = list(self._recentes)
+            self._alterado = False
+            self._ultimo_desenho = agora
+            self._desenhos += 1
+
+        tabela = pd.concat(recentes, ignore_index=True).tail(self.max_linhas)
+        with self.placeholder.container():
+            st.write(
+                f"📡 {int(contagem.sum())} decisões recebidas até agora "
+                f"(primeira em {self.primeiro_resultado:.1f}s): "
+                + ", ".join(f"{tribunal} {quantidade}" for tribunal, quantidade in contagem.items())
+            )
+            st.plotly_chart(
+                grafico_por_tribunal(contagem, 'Resultados recebidos por tribunal (parcial)'),
+                key=f"grafico_parcial_{self._desenhos}"
+            )
+            st.dataframe(tabela, hide_index=True)
+
+    def limpar(self):
+        self.placeholder.empty()
+
+
+# Ligada pela interface quando os resultados devem aparecer conforme chegam
+transmissao = None
+
+
+# Termos de cada consulta combinada ("a OU b" -> ["a", "b"]), para as páginas parciais
+# mostrarem os termos e não a expressão enviada ao tribunal
+termos_das_consultas = {}
+
+
+def transmitir_resultados(pagina):
+    """Envia uma página de resultados (DataFrame) para a tela, se a transmissão estiver ligada."""
+    if transmissao is not None:
+        if pagina is not None and not pagina.empty and "Termos" in pagina:
+            consulta = pagina["Termos"].iat[0]
+            termos = termos_das_consultas.get(consulta)
+            if termos:
+                pagina = atribuir_termos(pagina, termos, consulta)
+        transmissao.adicionar(pagina)
+
+
+# Tribunais consultados e ordem em que os resultados são unificados
+TRIBUNAIS = ["TJSP", "TJDFT", "TJBA", "TJAP", "TJPR"]
+
+# Número máximo de buscas simultâneas por tribunal.
+# O TJSP fica limitado ao número de navegadores do pool.
+LIMITE_CONCORRENCIA = {
+    "TJSP": TAMANHO_POOL_NAVEGADORES,
+    "TJPR": 2,
+    "TJDFT": 2,
+    "TJBA": 2,
+    "TJAP": 2,
+}
+
+
+def buscar_no_tribunal(tribunal, buscar, termos):
+    """
+    Faz uma única consulta ao tribunal para todos os termos do grupo (ligados por OU quando
+    há mais de um) e atualiza o histórico de decisões de cada termo.
+    No modo incremental, a busca recebe as decisões já conhecidas de todos os termos do grupo
+    para parar a paginação cedo.
+
+    Devolve `(resultados, novos)`: no modo incremental, `resultados` é o histórico completo dos
+    (tribunal, termo) com as novidades e `novos` só as decisões que ainda não eram conhecidas do
+    termo (uma linha por termo), que são as que vão para o acervo; fora dele, os dois são a
+    própria coleta. As decisões em que nenhum termo aparece na ementa ficam no histórico da
+    própria consulta combinada.
+    """
+    historico = obter_historico_decisoes()
+    consulta = montar_consulta_combinada(tribunal, termos)
+    if len(termos) > 1:
+        termos_das_consultas[consulta] = list(termos)
+    # Cada termo e, numa consulta combinada, a própria consulta (decisões sem nenhum termo na ementa)
+    chaves = list(dict.fromkeys([*termos, consulta]))
+
+    conhecidos = None
+    if modo_incremental:
+        conhecidos_por_termo = {chave: historico.conhecidos(tribunal, chave) for chave in chaves}
+        # A paginação só para em decisões conhecidas de todos os termos: um termo sem histórico
+        # (ou buscado há menos tempo) ainda precisa das páginas mais antigas
+        conhecidos = set.intersection(*(conhecidos_por_termo[termo] for termo in termos))
+        if conhecidos:
+            mais_recente = max((historico.data_mais_recente(tribunal, termo) or "" for termo in termos), default="")
+            status.info(
+                f"🔁 {tribunal}: {len(conhecidos)} decisões já conhecidas para {', '.join(termos)} "
+                f"(mais recente: {mais_recente or 'N/A'})"
+            )
+
+    resultados = buscar(consulta, conhecidos=conhecidos)
+    if resultados is None:
+        resultados = pd.DataFrame(columns=COLUNAS_RESULTADO)
+    if len(termos) > 1:
+        resultados = atribuir_termos(resultados, termos, consulta)
+    for chave in chaves:
+        historico.registrar(tribunal, chave, so_do_termo(resultados, chave))
+
+    if not modo_incremental:
+        return resultados, resultados
+    # Comparada termo a termo: a decisão já conhecida de um termo pode ser novidade para outro
+    novos = []
+    for chave in chaves:
+        da_chave = so_do_termo(resultados, chave)
+        if not da_chave.empty:
+            da_chave = da_chave[~da_chave["Número do Processo"].astype(str).isin(conhecidos_por_termo[chave])]
+            novos.append(da_chave.assign(Termos=chave))
+    novos = pd.concat(novos, ignore_index=True) if novos else resultados.iloc[:0]
+    historico_completo = pd.concat(
+        [historico.carregar(tribunal, chave).assign(Termos=chave) for chave in chaves], ignore_index=True
+    )
+    return historico_completo, novos
+
+
+# 🔢 Número CNJ (NNNNNNN-DD.AAAA.J.TR.OOOO), aceitando separadores ausentes ou trocados
+PADRAO_CNJ = (
+    r"^\D*(?P<sequencial>\d{1,7})[-.\s]?(?P<digito>\d{2})[-.\s]?(?P<ano>\d{4})"
+    r"[-.\s]?(?P<segmento>\d)[-.\s]?(?P<tribunal>\d{2})[-.\s]?(?P<origem>\d{4})\D*$"
+)
+
+# Chaves por hash ficam com o bit mais alto ligado e nunca colidem com as chaves CNJ (< 10^18)
+BIT_CHAVE_HASH = 1 << 63
+
+
+def normalizar_numeros_cnj(numeros, tribunais):
+    """
+    Converte os números de processo para o formato CNJ e calcula uma chave inteira para a deduplicação.
+
+    Só os textos distintos são analisados, com o regex e as funções de texto do Arrow (em C++):
+    o dígito verificador (módulo 97) é conferido com aritmética inteira e os números válidos viram
+    a chave dos 18 dígitos sem o verificador, igual em qualquer tribunal. Números fora do padrão
+    ou com verificador inválido mantêm o texto original e recebem um hash de (tribunal, número).
+    Devolve `(numeros_normalizados, chaves, validos)`.
+    """
+    codigos, unicos = pd.factorize(numeros.astype(str).to_numpy())
+    texto = pc.utf8_trim_whitespace(pa.array(unicos, type=pa.string()))
+    partes = pc.extract_regex(texto, PADRAO_CNJ)
+    extraido = partes.is_valid().to_numpy(zero_copy_only=False)
+    partes = partes.filter(partes.is_valid())
+    campos = {nome: partes.field(nome) for nome in ("sequencial", "digito", "ano", "segmento", "tribunal", "origem")}
+    valores = {nome: pc.cast(campo, pa.int64()).to_numpy() for nome, campo in campos.items()}
+
+    base = (
+        valores["sequencial"] * 10 ** 11 + valores["ano"] * 10 ** 7 + valores["segmento"] * 10 ** 6
+        + valores["tribunal"] * 10 ** 4 + valores["origem"]
+    )
+    corretos = (98 - (base % 97) * 100 % 97) == valores["digito"]
+
+    validos_unicos = np.zeros(len(unicos), dtype=bool)
+    validos_unicos[extraido] = corretos
+    chaves_unicas = np.zeros(len(unicos), dtype="uint64")
+    chaves_unicas[validos_unicos] = base[corretos].astype("uint64")
+    normalizados_unicos = texto.to_numpy(zero_copy_only=False)
+    normalizados_unicos[validos_unicos] = pc.binary_join_element_wise(
+        pc.utf8_lpad(campos["sequencial"], 7, "0"),
+        pc.binary_join_element_wise(
+            campos["digito"], campos["ano"], campos["segmento"], campos["tribunal"], campos["origem"], "."
+        ),
+        "-",
+    ).filter(pa.array(corretos)).to_numpy(zero_copy_only=False)
+
+    validos = validos_unicos[codigos]
+    chaves = chaves_unicas[codigos]
+    if not validos.all():
+        invalidos = pd.DataFrame({
+            "tribunal": tribunais.astype(str).to_numpy()[~validos],
+            "numero": normalizados_unicos[codigos[~validos]],
         })
-    return pd.DataFrame(resultados)
+        chaves[~validos] = pd.util.hash_pandas_object(invalidos, index=False).to_numpy() | np.uint64(BIT_CHAVE_HASH)
+    return pd.Series(normalizados_unicos[codigos], index=numeros.index), chaves, validos
 
-def processar_resultados_tjba(decisoes, total_itens, total_paginas, termo):
+
+def juntar_termos(chaves, termos):
     """
-    Processa a lista de decisões em um DataFrame.
+    Junta os termos únicos de cada chave, em ordem alfabética ("a, b"), sem funções Python por linha:
+    cada termo vira uma coluna booleana, o máximo por chave diz quais termos ela tem e cada
+    combinação distinta de termos é traduzida para texto uma única vez.
     """
-    resultados = []
-    for decisao in decisoes:
-        resultados.append({
-            "Tribunal": "TJBA",
-            "Termos": termo,
-            "Número do Processo": decisao.get("numeroProcesso", "N/A"),
-            "Relator": decisao.get("relator", {}).get("nome", "N/A"),
-            "Órgão Julgador": decisao.get("orgaoJulgador", {}).get("nome", "N/A"),
-            "Data da Publicação": decisao.get("dataPublicacao", "N/A"),
-            "Ementa": decisao.get("conteudo", "N/A"),  # Texto completo
+    codigos, textos = pd.factorize(termos.astype(str).to_numpy())
+    # Um texto pode já trazer vários termos ("a, b"), por exemplo vindo do histórico
+    separados = [texto.split(", ") for texto in textos]
+    nomes = sorted({nome for partes in separados for nome in partes})
+    if len(nomes) > 62:
+        return pd.Series(termos.to_numpy()).groupby(chaves, sort=False).agg(
+            lambda x: ", ".join(sorted({nome for texto in x for nome in str(texto).split(", ")}))
+        )
+
+    posicao = {nome: i for i, nome in enumerate(nomes)}
+    presentes = np.zeros((len(textos), len(nomes)), dtype=bool)
+    for linha, partes in enumerate(separados):
+        presentes[linha, [posicao[nome] for nome in partes]] = True
+
+    por_chave = pd.DataFrame(presentes[codigos]).groupby(chaves, sort=False).max()
+    return pd.Series(nomes_presentes(por_chave.to_numpy(), nomes), index=por_chave.index)
+
+
+def nomes_presentes(presentes, nomes):
+    """
+    Traduz uma matriz booleana (linha x nome) para textos "a, b". Cada linha vira uma máscara de
+    bits e cada máscara distinta é traduzida uma única vez. Aceita até 62 nomes.
+    """
+    mascaras = presentes @ (np.int64(1) << np.arange(len(nomes), dtype="int64"))
+    unicas, posicoes = np.unique(mascaras, return_inverse=True)
+    textos = np.array(
+        [", ".join(nome for i, nome in enumerate(nomes) if mascara >> i & 1) for mascara in unicas], dtype=object
+    )
+    return textos[posicoes]
+
+
+def unificar_resultados(resultados):
+    """
+    Agrupa as decisões do mesmo processo (em termos ou tribunais diferentes) e junta os termos únicos.
+    O número do processo é normalizado para o formato CNJ antes da comparação.
+    """
+    colunas = ['Número do Processo', 'Tribunal', 'Relator', 'Órgão Julgador', 'Data da Publicação', 'Ementa', 'Termos']
+    resultados = resultados[resultados['Número do Processo'].notna()]
+    if resultados.empty:
+        return pd.DataFrame(columns=colunas)
+
+    numeros, chaves, _ = normalizar_numeros_cnj(resultados['Número do Processo'], resultados['Tribunal'])
+    dados = resultados.assign(**{'Número do Processo': numeros.to_numpy()})
+    unificados = dados.groupby(chaves, sort=False)[colunas[:-1]].first()
+    unificados['Termos'] = juntar_termos(chaves, resultados['Termos'])
+    return unificados.sort_values('Número do Processo', kind="stable").reset_index(drop=True)[colunas]
+
+
+# 📦 Formatos oferecidos para download: extensão -> (rótulo, tipo MIME)
+FORMATOS_EXPORTACAO = {
+    "xlsx": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+    "csv": ("CSV", "text/csv"),
+    "jsonl": ("JSON Lines", "application/jsonl"),
+}
+
+
+def exportar_excel(resultados, destino):
+    """
+    Escreve a planilha no modo constant_memory do xlsxwriter: cada linha vai para um arquivo
+    temporário assim que é escrita, em vez de a planilha inteira ser montada na memória.
+    """
+    livro = xlsxwriter.Workbook(destino, {"constant_memory": True, "strings_to_urls": False})
+    planilha = livro.add_worksheet("Resultados")
+    planilha.write_row(0, 0, list(resultados.columns), livro.add_format({"bold": True}))
+
+    # Só as colunas com valores ausentes precisam de tratamento célula a célula
+    com_ausentes = [i for i, coluna in enumerate(resultados.columns) if resultados[coluna].hasnans]
+    for linha, valores in enumerate(resultados.itertuples(index=False, name=None), start=1):
+        if com_ausentes:
+            valores = list(valores)
+            for i in com_ausentes:
+                if pd.isna(valores[i]):
+                    valores[i] = None
+        planilha.write_row(linha, 0, valores)
+    livro.close()
+
+
+def exportar_resultados(resultados, formato):
+    """Serializa os resultados uma única vez no formato pedido e devolve o buffer para download."""
+    buffer = io.BytesIO()
+    if formato == "xlsx":
+        exportar_excel(resultados, buffer)
+    elif formato == "parquet":
+        resultados.to_parquet(buffer, index=False)
+    elif formato == "csv":
+        # Com BOM, para o Excel reconhecer os acentos ao abrir o CSV
+        resultados.to_csv(buffer, index=False, encoding="utf-8-sig")
+    elif formato == "jsonl":
+        resultados.to_json(buffer, orient="records", lines=True, force_ascii=False)
+    else:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    buffer.seek(0)
+    return buffer
+
+
+# 🧮 Tribunais que aceitam vários termos ligados por OU em uma só consulta:
+# operador usado na expressão e tamanho máximo de cada consulta combinada
+CONSULTA_COMBINADA = {
+    "TJSP": {"operador": "OU", "max_caracteres": 250},
+    "TJPR": {"operador": "OU", "max_caracteres": 250},
+    "TJDFT": {"operador": "OU", "max_caracteres": 500},
+}
+
+
+def montar_consulta_combinada(tribunal, termos):
+    """Expressão booleana com os termos ligados por OU; termos com espaço vão entre aspas."""
+    if len(termos) == 1:
+        return termos[0]
+    operador = CONSULTA_COMBINADA[tribunal]["operador"]
+    return f" {operador} ".join(f'"{termo}"' if " " in termo else termo for termo in termos)
+
+
+def planejar_consultas(tribunal, termos):
+    """
+    Agrupa os termos nas consultas que serão feitas ao tribunal: um grupo por termo nos tribunais
+    sem consulta combinada e, nos demais, o menor número de grupos que cabe no tamanho máximo.
+    """
+    configuracao = CONSULTA_COMBINADA.get(tribunal)
+    if not configuracao:
+        return [[termo] for termo in termos]
+    grupos = []
+    atual = []
+    for termo in termos:
+        if atual and len(montar_consulta_combinada(tribunal, atual + [termo])) > configuracao["max_caracteres"]:
+            grupos.append(atual)
+            atual = []
+        atual.append(termo)
+    if atual:
+        grupos.append(atual)
+    return grupos
 
-            #"Classe Processual": decisao.get("classe", {}).get("descricao", "N/A"),
-            #"Hash ID": decisao.get("hash", "N/A"),  # Identificador único
-            #"Total de Itens": total_itens,
-            #"Total de Páginas": total_paginas
-        })
 
-    return pd.DataFrame(resultados)
+def sem_acentos(textos):
+    """Minúsculas e sem acentos (série do Arrow), para comparar termos e ementas."""
+    decompostos = pc.utf8_normalize(textos, "NFKD")
+    return pc.utf8_lower(pc.replace_substring_regex(decompostos, r"\p{Mn}", ""))
 
-def processar_resultados_tjdf(json_result, termo):
-    registros = json_result.get("registros", [])  # Lista de decisões
-    resultados = []
 
-    for registro in registros:
-        jurisprudencia_links = []
-        if registro.get("jurisprudenciaEmFoco"):
-            jurisprudencia_links = [
-                f"{item.get('descricao')}: {item.get('link')}"
-                for item in registro.get("jurisprudenciaEmFoco", [])
-            ]
+def atribuir_termos(resultados, termos, consulta):
+    """
+    Descobre quais dos termos de uma consulta combinada aparecem em cada ementa e preenche
+    `Termos` como se cada termo tivesse sido buscado separadamente.
 
-        resultados.append({
-            "Tribunal": "TJDFT",
-            "Termos": termo,
-            "Número do Processo": registro.get("processo", "N/A"),
-            "Relator": registro.get("nomeRelator", "N/A"),
-            "Órgão Julgador": registro.get("descricaoOrgaoJulgador", "N/A"),
-            "Data da Publicação": registro.get("dataPublicacao", "N/A"),
-            "Ementa": registro.get("ementa", "N/A")
+    Cada termo vira um padrão (sem acentos, com espaços flexíveis e limites de palavra) aplicado
+    de forma vetorizada pelo Arrow à coluna inteira. Decisões em que nenhum termo aparece na
+    ementa (o tribunal também busca no inteiro teor e em sinônimos) não são atribuídas a nenhum
+    termo e ficam com a própria `consulta`.
+    """
+    if resultados.empty:
+        return resultados
+    termos = sorted(termos)
+    ementas = sem_acentos(pa.array(resultados["Ementa"].astype(str).to_numpy(), type=pa.string()))
+    padroes = sem_acentos(pa.array(termos, type=pa.string())).to_pylist()
+    presentes = np.column_stack([
+        pc.match_substring_regex(ementas, r"\b" + r"\s+".join(re.escape(parte) for parte in padrao.split()) + r"\b")
+        .fill_null(False).to_numpy(zero_copy_only=False)
+        for padrao in padroes
+    ])
+    nomes = nomes_presentes(presentes, termos)
+    nomes[~presentes.any(axis=1)] = consulta
+    return resultados.assign(Termos=nomes)
+
+
+def buscar_jurisprudencias_unificadas(termos, tribunais=None):
+    """
+    Busca os termos nos tribunais (todos os de TRIBUNAIS, se não informados), guarda a coleta
+    no acervo e no índice das ementas e devolve `(resultados_unificados, total)`.
+    O navegador e o 2Captcha só são usados quando o TJSP está entre os tribunais.
+    """
+    tribunais = [tribunal for tribunal in TRIBUNAIS if tribunais is None or tribunal in tribunais]
+    # Sem repetições, mantendo a ordem (um termo repetido viraria tarefas duplicadas)
+    termos = list(dict.fromkeys(termos))
+
+    buscas = {
+        "TJSP": buscar_jurisprudencia_tjsp,
+        "TJPR": buscar_jurisprudencia_tjpr,
+        "TJDFT": buscar_jurisprudencia_tjdf,
+        "TJBA": buscar_jurisprudencia_tjba,
+        "TJAP": buscar_jurisprudencia_tjap,
+    }
 
-            #"Data do Julgamento": registro.get("dataJulgamento", "N/A"),
-            #"Identificador": registro.get("identificador", "N/A"),
-            #"Decisão": registro.get("decisao", "N/A"),
-            #"Local de Publicação": registro.get("localDePublicacao", "N/A"),
-            #"Segredo de Justiça": registro.get("segredoJustica", False),
-            #"Inteiro Teor": registro.get("inteiroTeorHtml", "N/A"),
-            #"Jurisprudência Relacionada": "; ".join(jurisprudencia_links) if jurisprudencia_links else "N/A",
-            #"Possui Inteiro Teor": registro.get("possuiInteiroTeor", False),
-        })
+    status.escrever(f"> **BUSCA PELOS TERMOS {', '.join(termos).upper()}**")
+    status.escrever(f"🔍 Buscando jurisprudência no {', '.join(tribunais)}...")
+
+    # Nos tribunais que aceitam OU, vários termos vão na mesma consulta.
+    # As tarefas seguem a ordem dos termos (e, para cada termo, a dos tribunais).
+    planos = {tribunal: planejar_consultas(tribunal, termos) for tribunal in tribunais}
+    tarefas = [
+        (tribunal, tuple(grupo))
+        for termo in termos
+        for tribunal in tribunais
+        for grupo in planos[tribunal]
+        if grupo[0] == termo
+    ]
+
+    # O CAPTCHA do TJSP começa a ser resolvido enquanto os outros tribunais são consultados
+    if "TJSP" in tribunais and any(
+        ler_cache("TJSP", montar_consulta_combinada("TJSP", grupo), 0, {"consulta": "completa"}) is None
+        for grupo in planos["TJSP"]
+    ):
+        obter_solucionador_captcha().preaquecer()
+
+    # Os objetos compartilhados são resolvidos aqui, na thread do script, antes das threads das buscas
+    obter_cache_respostas()
+    obter_historico_decisoes()
+    for tribunal in tribunais:
+        obter_sessao(tribunal)
+    if "TJSP" in tribunais:
+        obter_sessao("2CAPTCHA")
+        obter_solucionador_captcha()
+        obter_pool_navegadores()
+    trafego_antes = {tribunal: dict(obter_controlador_trafego(tribunal).estatisticas) for tribunal in tribunais}
+
+    # 🚀 Um pool por tribunal: cada (tribunal, grupo de termos) vira uma tarefa, e o limite de
+    # concorrência de um tribunal não bloqueia os demais
+    executores = {
+        tribunal: ThreadPoolExecutor(max_workers=LIMITE_CONCORRENCIA.get(tribunal, 1), thread_name_prefix=tribunal)
+        for tribunal in tribunais
+    }
+    futuros = {}
+    try:
+        for tribunal, grupo in tarefas:
+            futuro = executores[tribunal].submit(buscar_no_tribunal, tribunal, buscas[tribunal], list(grupo))
+            futuros[futuro] = (tribunal, grupo)
+
+        resultados_por_tarefa = {}
+        pendentes = set(futuros)
+        while pendentes:
+            concluidos, pendentes = aguardar_futuros(pendentes, timeout=0.5, return_when=FIRST_COMPLETED)
+            status.descarregar()
+            if transmissao is not None:
+                transmissao.descarregar()
+            for futuro in concluidos:
+                tribunal, grupo = futuros[futuro]
+                descricao = f"o termo {grupo[0]}" if len(grupo) == 1 else f"os termos {', '.join(grupo)} (consulta combinada)"
+                try:
+                    resultados_por_tarefa[(tribunal, grupo)] = futuro.result()
+                    status.escrever(f"✅ Busca concluída no {tribunal} para {descricao}...")
+                except Exception as e:
+                    resultados_por_tarefa[(tribunal, grupo)] = (pd.DataFrame(), pd.DataFrame())
+                    status.escrever(f"❌ Erro na busca do {tribunal} para {descricao}: {e}")
+    finally:
+        for executor in executores.values():
+            executor.shutdown(wait=True)
+        status.limpar()
+        for tribunal in tribunais:
+            status.escrever(resumo_trafego(tribunal, trafego_antes[tribunal]))
+        if transmissao is not None:
+            transmissao.limpar()
+
+    resultados_unificados = AcumuladorResultados()
+    coletados = AcumuladorResultados()
+    for tarefa in tarefas:
+        resultados, novos = resultados_por_tarefa[tarefa]
+        resultados_unificados.adicionar(resultados)
+        coletados.adicionar(novos)
+    resultados_unificados = resultados_unificados.para_dataframe()
+    coletados = coletados.para_dataframe()
+
+    # 💾 A coleta fica guardada no acervo, para ser reaberta sem consultar os tribunais de novo.
+    # No modo incremental só entram as decisões novas: o histórico já está no acervo
+    try:
+        obter_acervo().adicionar(coletados, datetime.now())
+    except Exception as e:
+        status.escrever(f"⚠️ Não foi possível guardar os resultados no acervo: {e}")
+    try:
+        obter_indice_ementas().indexar(coletados)
+    except sqlite3.Error as e:
+        status.escrever(f"⚠️ Não foi possível atualizar o índice das ementas: {e}")
 
-    return pd.DataFrame(resultados)
+    resultados_unificados = unificar_resultados(resultados_unificados)
 
-def processar_resultados_tjpr(html_result, termo):
-    if not html_result:
-        return pd.DataFrame()
-
-    # 📌 Divide o HTML em blocos baseados nas âncoras dos documentos
-    documentos = re.split(r'<a name="DOC\d+"></a>', html_result)
-
-    dados_processos = []
-
-    for i, doc_html in enumerate(documentos[1:], start=1):
-        doc_id = f"DOC{i + 1}"  # Nome do documento atual (DOC1, DOC2, etc.)
-
-        # 📌 Captura o número do processo corretamente
-        processos = re.findall(r'<b>Processo:</b>.*?<div[^>]*>\s*<div[^>]*>(.*?)</div>', doc_html, re.DOTALL)
-
-        # 📌 Segredo de Justiça
-        segredo_justica = re.findall(r'<b>Segredo de Justiça:</b>\s*(.*?)<', doc_html)
-
-        # 📌 Captura nome do relator corretamente
-        relatores = re.findall(r'<b>Relator\(a\):</b>\s*([\w\sÁÉÍÓÚáéíóúãõçü-]+)', doc_html)
-
-        # 📌 Captura cargo do relator, se existir
-        cargos_relatores = re.findall(r'<b>Relator\(a\):</b>.*?<i>(.*?)</i>', doc_html, re.DOTALL)
-
-        # Se não houver cargo, preencher com "N/A"
-        cargos_relatores += ["N/A"] * (len(relatores) - len(cargos_relatores))
-
-        # 📌 Outros campos básicos
-        orgaos = re.findall(r'<b>Órgão Julgador:</b>\s*(.*?)<', doc_html)
-        comarcas = re.findall(r'<b>Comarca:</b>\s*(.*?)<', doc_html)
-        datas_julgamento = re.findall(r'<b>Data do Julgamento:</b>\s*([\w\s:]+BRT\s\d{4})', doc_html)
-
-        # 📌 Captura da Data da Publicação corrigida
-        datas_publicacao = re.findall(r'<b>Fonte/Data da Publicação:</b>\s*&nbsp;([\w\s\d:]+BRT\s\d{4})', doc_html)
-
-        ementas = re.findall(r'<div id="ementa\d+"[^>]*>(.*?)</div>', doc_html, re.DOTALL)
-        integras = re.findall(r'<div\s+id="texto\d+"[^>]*>(.*?)<\/div>', doc_html, re.DOTALL | re.IGNORECASE)
-        anexos = re.findall(r"document\.location\.replace\('(/jurisprudencia/publico/visualizacao\.do\?tjpr\.url\.crypto=[^']+)'\)", doc_html)
-
-        # 📌 Limpeza de tags HTML
-        ementas = [re.sub(r'<[^>]+>', '', e).strip() for e in ementas]
-        integras = [re.sub(r'<[^>]+>', '', i).strip() for i in integras]
-        anexos = ["https://portal.tjpr.jus.br" + link if link else "N/A" for link in anexos]
-
-        # 📌 Ajustando tamanhos das listas
-        max_len = max(len(processos), len(segredo_justica), len(relatores), len(cargos_relatores),
-                      len(orgaos), len(comarcas), len(datas_julgamento), len(datas_publicacao),
-                      len(ementas), len(integras), len(anexos), 1)  # Garante pelo menos uma entrada
-        
-        processos += ["N/A"] * (max_len - len(processos))
-        segredo_justica += ["N/A"] * (max_len - len(segredo_justica))
-        relatores += ["N/A"] * (max_len - len(relatores))
-        cargos_relatores += ["N/A"] * (max_len - len(cargos_relatores))
-        orgaos += ["N/A"] * (max_len - len(orgaos))
-        comarcas += ["N/A"] * (max_len - len(comarcas))
-        datas_julgamento += ["N/A"] * (max_len - len(datas_julgamento))
-        datas_publicacao += ["N/A"] * (max_len - len(datas_publicacao))
-        ementas += ["N/A"] * (max_len - len(ementas))
-        integras += ["N/A"] * (max_len - len(integras))
-        anexos += ["N/A"] * (max_len - len(anexos))
-
-        for j in range(max_len):
-            dados_processos.append({
-                "Tribunal": "TJPR",
-                "Termos": termo,
-                "Número do Processo": processos[j],
-                "Relator": relatores[j],
-                "Órgão Julgador": orgaos[j],
-                "Data da Publicação": datas_publicacao[j],  # 🔥 Captura correta
-                "Ementa": ementas[j],
-
-                #"Segredo de Justiça": segredo_justica[j],
-                #"Cargo do Relator": cargos_relatores[j],
-                #"Comarca": comarcas[j],
-                #"Data do Julgamento": datas_julgamento[j],
-                #"Inteiro Teor": integras[j],
-                #"Documento Anexo": anexos[j]
-            })
+    total_resultados = len(resultados_unificados)
 
-    return pd.DataFrame(dados_processos)
+    return resultados_unificados, total_resultados
 
-def processar_resultados_tjap(json_result, termo):
-    decisoes = json_result.get("dados", [])
-    resultados = []
+# 🔎 Consulta do TJSP
+# Os endereços dos tribunais e do 2Captcha podem ser trocados por variáveis de ambiente
+# de mesmo nome, por exemplo para apontar para benchmarks/servidor_simulado.py
+URL_TJSP = os.environ.get("URL_TJSP", "https://esaj.tjsp.jus.br/cjsg/consultaCompleta.do")
+URL_TJSP_TROCA_PAGINA = os.environ.get("URL_TJSP_TROCA_PAGINA", "https://esaj.tjsp.jus.br/cjsg/trocaDePagina.do")
 
-    for decisao in decisoes:
-        resultados.append({
-            "Tribunal": "TJAP",
-            "Termos": termo,
-            "Número do Processo": decisao.get("numeroano", "N/A"),
-            "Relator": decisao.get("nomerelator", "N/A"),
-            "Órgão Julgador": decisao.get("lotacao", "N/A"),
-            "Data da Publicação": decisao.get("datajulgamento", "N/A"),
-            "Ementa": decisao.get("textoementa", "N/A"),
+# Sitekey do reCAPTCHA v3
+SITE_KEY_TJSP = "6LcXJIAbAAAAAOwprTGEEYwRSe-HMYD-Ys0pSR6f"
 
-            #"Classe Processual": decisao.get("classe", "N/A"),
-            #"Inteiro Teor": "N/A",
-            #"Documento Anexo": "N/A"
-        })
+# "http" tenta primeiro a consulta direta e usa o navegador só se ela for recusada;
+# "navegador" usa sempre o Selenium
+MOTOR_TJSP = "http"
 
-    return pd.DataFrame(resultados)
 
-def consultar_resultados_tjdf_por_pagina(termos, pagina):
-    url = "https://jurisdf.tjdft.jus.br/api/v1/pesquisa"
-    payload = {
-        "query": termos,
-        "termosAcessorios": [],
-        "pagina": pagina,
-        "tamanho": 10,
-        "sinonimos": True,
-        "espelho": True,
-        "inteiroTeor": True,
-        "retornaInteiroTeor": False,
-        "retornaTotalizacao": True
-    }
-    headers = {"Content-Type": "application/json"}
+def buscar_jurisprudencia_tjsp(termo, conhecidos=None):
+    # O resultado completo do termo fica em cache, evitando o navegador e o CAPTCHA
+    em_cache = ler_cache("TJSP", termo, 0, {"consulta": "completa"})
+    if em_cache is not None:
+        status.info(f"💾 Resultados do TJSP para {termo} recuperados do cache")
+        resultados = pd.DataFrame.from_records(json.loads(em_cache))
+        transmitir_resultados(resultados)
+        return resultados
 
-    try:
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()  # Isso levanta um erro se o status for >= 400
-        json_result = response.json()
-        total_hits = json_result.get("hits", {}).get("value", 0)
-        return json_result, total_hits
-    except requests.exceptions.HTTPError as e:
-        if response.status_code == 500:
-            st.warning("O servidor do TJDFT retornou um erro 500. Tentando continuar sem ele...")
-        else:
-            st.error(f"Erro ao acessar a API do TJDFT: {e}")
-        return None, 0
-    except requests.exceptions.RequestException as e:
-        st.error(f"Erro de conexão com o TJDFT: {e}")
-        return None, 0
+    resultados, completo = None, False
+    if MOTOR_TJSP == "http":
+        try:
+            resultados, completo = buscar_jurisprudencia_tjsp_http(termo, conhecidos)
+        except ErroTjspHttp as e:
+            status.warning(f"⚠️ TJSP recusou a consulta direta ({e}). Usando o navegador...")
 
-def consultar_resultados_tjpr_por_pagina(termo, pagina):
-    url = "https://portal.tjpr.jus.br/jurisprudencia/publico/pesquisa.do"
-    params = {
-        "actionType": "pesquisar",
-        "criterioPesquisa": termo,
-        "idLocalPesquisa": "1",
-        "mostrarCompleto": "true",
-        "iniciar": "Pesquisar",
-        "pageSize": "10",
-        "pageNumber": pagina
-    }
+    if resultados is None:
+        try:
+            with obter_pool_navegadores().navegador() as driver:
+                resultados, completo = buscar_jurisprudencia_tjsp_no_navegador(driver, termo, conhecidos)
+        except ErroNavegador:
+            status.error("⚠️ Ocorreu um problema ao configurar o navegador automático. Verifique sua conexão com a internet ou tente novamente mais tarde.")
+            return pd.DataFrame()
+
+    if not completo:
+        # Só uma parte das páginas: mostrada nesta busca, mas fora do cache para a próxima ir ao TJSP
+        status.warning(f"⚠️ Resultados do TJSP incompletos para {termo}; não foram guardados no cache")
+    elif isinstance(resultados, pd.DataFrame) and not conhecidos:
+        gravar_cache("TJSP", termo, 0, resultados.to_json(orient="records", force_ascii=False), {"consulta": "completa"})
+    return resultados
+
+
+def elemento_resultado_tjsp(nome, atributos):
+    """Filtro do parser: só as linhas de resultado e as divs com a ementa entram na árvore."""
+    if nome == "tr":
+        classes = atributos.get("class") or ""
+        if not isinstance(classes, str):
+            classes = " ".join(classes)
+        return "fundocinza1" in classes.split()
+    if nome == "div":
+        return (atributos.get("id") or "").startswith("textAreaDados_")
+    return False
+
+
+def extrair_processos_tjsp(html):
+    """
+    Extrai os dados de cada linha `tr.fundocinza1` de uma página de resultados do TJSP.
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
-    }
+    O HTML é lido uma única vez pelo parser em C (lxml, quando instalado), guardando só as
+    linhas de resultado e as divs `textAreaDados_*`, e as ementas são achadas por um índice de ids.
+    Não depende do navegador, então pode ser usada em qualquer thread ou em benchmarks.
+    """
+    soup = bs4.BeautifulSoup(html, PARSER_HTML, parse_only=bs4.SoupStrainer(elemento_resultado_tjsp))
+    ementas = {div["id"]: div for div in soup.find_all("div", id=True) if div["id"].startswith("textAreaDados_")}
+    resultados = []
 
-    try:
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        html = response.text
+    for processo in soup.find_all("tr", class_="fundocinza1"):
+        dados = {}
 
-        # Extraindo o número total de registros usando regex
-        match = re.search(r'(\d+)\s+registro\(s\)\s+encontrado\(s\)', html)
-        total_registros = int(match.group(1)) if match else 0
+        processo_link = processo.find("a", class_="esajLinkLogin downloadEmenta")
+        if processo_link:
+            dados["numero_processo"] = processo_link.text.strip()
+            dados["cdacordao"] = processo_link.get("cdacordao", None)
 
-        return html, total_registros
+        if dados.get("cdacordao"):
+            ementa_div = ementas.get(f"textAreaDados_{dados['cdacordao']}")
+            if ementa_div:
+                dados["ementa_curta"] = ementa_div.text.strip().split("  (TJSP")[0]
 
-    except requests.RequestException as e:
-        print(f"Erro ao acessar o TJPR: {e}")
-        return None, 0
+        for tr in processo.find_all("tr", class_="ementaClass2"):
+            strong = tr.find("strong")
+            if strong:
+                chave = strong.text.strip().replace(":", "")
+                valor = tr.get_text().strip().replace(strong.text.strip(), "").strip()
+                if chave and valor:
+                    dados[chave] = valor
 
-def resolver_captcha(url, site_key):
-    global captcha_token, captcha_expiration_time
-    print("🔄 Resolvendo CAPTCHA com 2Captcha...")
+        resultados.append(dados)
 
-    while True:  # Loop infinito até resolver corretamente
-        captcha_payload = {
-            'key': API_KEY,
-            'method': 'userrecaptcha',
-            'version': 'v3',
-            'action': 'consulta',
-            'min_score': 0.3,
-            'googlekey': site_key,
-            'pageurl': url,
-            'json': 1
-        }
-        captcha_response = requests.get('http://2captcha.com/in.php', params=captcha_payload).json()
+    return resultados
 
-        if captcha_response["status"] != 1:
-            print("❌ Erro ao enviar CAPTCHA:", captcha_response["request"])
-            time.sleep(5)
+
+class ErroTjspHttp(Exception):
+    """O TJSP recusou a consulta feita sem navegador."""
+
+
+def montar_formulario_tjsp(html, termo, token):
+    """
+    Lê o formulário de consulta da página do TJSP (ação e campos com seus valores padrão)
+    e preenche o termo e o token do reCAPTCHA, como o navegador faria.
+    """
+    soup = bs4.BeautifulSoup(html, "html.parser")
+    campo_busca = soup.find(attrs={"name": "dados.buscaInteiroTeor"})
+    formulario = campo_busca.find_parent("form") if campo_busca else None
+    if formulario is None:
+        raise ErroTjspHttp("formulário de consulta não encontrado")
+
+    campos = []
+    for campo in formulario.find_all(["input", "select", "textarea"]):
+        nome = campo.get("name")
+        if not nome:
             continue
+        if campo.name == "input":
+            tipo = (campo.get("type") or "text").lower()
+            if tipo in ("checkbox", "radio") and not campo.has_attr("checked"):
+                continue
+            if tipo in ("button", "image", "reset"):
+                continue
+            valor = campo.get("value", "")
+        elif campo.name == "select":
+            opcao = campo.find("option", selected=True) or campo.find("option")
+            valor = opcao.get("value", opcao.text) if opcao else ""
+        else:
+            valor = campo.text
+        campos.append((nome, valor))
 
-        captcha_id = captcha_response["request"]
-        print(f"🆔 CAPTCHA enviado, ID: {captcha_id}")
+    substituicoes = {
+        "dados.buscaInteiroTeor": termo,
+        "id_recaptcha_response_token": token,
+        "g-recaptcha-response": token,
+    }
+    campos = [(nome, substituicoes.get(nome, valor)) for nome, valor in campos]
+    for nome in ("id_recaptcha_response_token", "g-recaptcha-response"):
+        if nome not in dict(campos):
+            campos.append((nome, token))
 
-        for _ in range(10):  # Espera até 50s
-            solution_response = requests.get(
-                f"http://2captcha.com/res.php?key={API_KEY}&action=get&id={captcha_id}&json=1"
-            ).json()
+    acao = urljoin(URL_TJSP, formulario.get("action") or URL_TJSP)
+    return acao, campos
 
-            if solution_response["status"] == 1:
-                captcha_token = solution_response["request"]
-                captcha_expiration_time = time.time() + 120  # Token válido por 2 minutos
-                print(f"✅ CAPTCHA resolvido: {captcha_token[:30]}... (truncado)")
-                return
 
-            print("⌛ Aguardando solução do CAPTCHA...")
-            time.sleep(5)
+def buscar_jurisprudencia_tjsp_http(termo, conhecidos=None):
+    """
+    Consulta o TJSP sem navegador: envia o formulário do `consultaCompleta.do` e segue a
+    paginação por HTTP, usando o token do reCAPTCHA e os cookies da própria sessão.
+    Levanta ErroTjspHttp quando o site recusa a consulta, para que o navegador seja usado.
+    Devolve `(resultados, completo)`; `completo` é falso quando a paginação parou por erro.
+    """
+    captcha_token = obter_solucionador_captcha().obter_token()
 
-        print("❌ CAPTCHA falhou, tentando novamente em 15s...")
-        time.sleep(15)
+    # Sessão própria (cookies da consulta), mas com o pool de conexões compartilhado do TJSP
+    compartilhada = obter_sessao("TJSP")
+    sessao = requests.Session()
+    sessao.headers.update(compartilhada.headers)
+    sessao.mount("https://", compartilhada.get_adapter("https://"))
+    sessao.mount("http://", compartilhada.get_adapter("http://"))
 
-# Interface do Streamlit
-st.title("🔍 TJSearch")
-st.subheader("Consulta de Jurisprudência Unificada")
-st.subheader("TJAP, TJBA, TJDFT, TJPR e TJSP")
-status = st.empty()  # espaço reservado na tela
+    status.info(f"📌 Buscando por: {termo} no TJSP (consulta direta)")
 
-palavras_chave_input = st.text_input("Palavras-chave (separadas por vírgula)")
-palavras_chave = [p.strip() for p in palavras_chave_input.split(",") if p.strip()]
+    try:
+        response = requisitar("TJSP", "GET", URL_TJSP, sessao=sessao)
+        response.raise_for_status()
+        acao, campos = montar_formulario_tjsp(response.text, termo, captcha_token)
 
-if st.button("Buscar") and palavras_chave:
-    resultados_df, total_hits = buscar_jurisprudencias_unificadas(palavras_chave)
-    st.write(f"Total de resultados: {total_hits}")
-    st.write(resultados_df)
+        response = requisitar("TJSP", "POST", acao, sessao=sessao, data=campos, headers={"Referer": URL_TJSP})
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        raise ErroTjspHttp(str(e)) from e
 
-    # Gráfico de barras com Plotly
-    contagem_tribunais = resultados_df['Tribunal'].value_counts(ascending=True).reset_index()
-    contagem_tribunais.columns = ['Tribunal', 'Número de Resultados']
+    resultados_finais = []
+    pagina = 1
+    completo = True
+    html = response.text
+    while True:
+        processos = extrair_processos_tjsp(html)
+        if not processos:
+            if pagina == 1 and not re.search(r"nenhum\s+resultado|não\s+foi\s+encontrad", html, re.IGNORECASE):
+                raise ErroTjspHttp("página de resultados não reconhecida")
+            break
+
+        resultados_finais.extend(processos)
+        transmitir_resultados(processar_resultados_tjsp(processos, termo))
+        status.info(f"📄 Extraídos {len(resultados_finais)} processos até a página {pagina} do TJSP...")
+
+        numeros_pagina = [dados.get("numero_processo") for dados in processos]
+        if conhecidos and all(numero in conhecidos for numero in numeros_pagina):
+            status.info(f"🔁 Página {pagina} do TJSP sem decisões novas. Encerrando busca incremental.")
+            break
+
+        if not re.search(r">\s*(?:&gt;|>)\s*</a>", html):
+            status.info("🔚 Última página alcançada no TJSP.")
+            break
+
+        pagina += 1
+        try:
+            response = requisitar(
+                "TJSP", "GET", URL_TJSP_TROCA_PAGINA, sessao=sessao,
+                params={"tipoDeDecisao": "A", "pagina": pagina},
+                headers={"Referer": acao}
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            status.error(f"Erro ao consultar a página #{pagina} do TJSP: {e}")
+            completo = False
+            break
+        html = response.text
 
-    fig = px.bar(contagem_tribunais, x='Tribunal', y='Número de Resultados', text='Número de Resultados',
-                 title='Distribuição de Resultados por Tribunal')
+    return processar_resultados_tjsp(resultados_finais, termo), completo
 
-    fig.update_traces(texttemplate='%{text}', textposition='outside')
-    fig.update_layout(uniformtext_minsize=12, uniformtext_mode='hide', xaxis_title='Tribunal', yaxis_title='Número de Resultados',
-                      xaxis_showgrid=False, yaxis_showgrid=False, font=dict(size=12))  # Aumenta o tamanho da fonte
+# Tentativas de abrir e enviar a consulta do TJSP no navegador antes de desistir do termo
+TENTATIVAS_TJSP_NAVEGADOR = 3
 
-    st.plotly_chart(fig)
 
+class ErroTjspNavegador(Exception):
+    """O TJSP não devolveu a página de resultados no navegador depois de todas as tentativas."""
 
-# Variável global para armazenar o token do reCAPTCHA
-captcha_token = None
-captcha_expiration_time = 0  
 
-# 🚗 Configuração do Selenium (Anti-detecção)
-options = webdriver.ChromeOptions()
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--disable-blink-features=AutomationControlled")
-options.add_argument("--disable-extensions")
-options.add_argument("--disable-popup-blocking")
-options.add_argument("--disable-plugins-discovery")
-options.add_argument("--incognito")
-options.add_argument("--headless")
-options.add_argument("--disable-gpu")
-options.add_argument(
-    "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
-)
-options.add_experimental_option("excludeSwitches", ["enable-automation"])
-options.add_experimental_option('useAutomationExtension', False)
-
-try:
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    wait = WebDriverWait(driver, 30)
-    # Ajuste anti-detecção
-    driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-        "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                     'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
-    })
-    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-except Exception as e:
-    st.error("⚠️ Ocorreu um problema ao configurar o navegador automático. Verifique sua conexão com a internet ou tente novamente mais tarde.")
-    st.stop()
-
-def buscar_jurisprudencias_unificadas(termos):
-
-    resultados_unificados = pd.DataFrame()
+# Tempo máximo (s) de cada espera do fluxo do TJSP no navegador
+TIMEOUTS_ESPERA_TJSP = {
+    "formulario": 30,
+    "envio": 30,
+    "carregamento": 30,
+    "resultados": 15,
+    "proxima_pagina": 30,
+}
 
-    for termo in termos:
 
-        st.write(f"> **BUSCA PELO TERMO {termo.upper()}**")
-
-        st.write("🔍 Buscando jurisprudência no TJSP...")
-        resultados_tjsp = buscar_jurisprudencia_tjsp(termo)
-        st.write("✅ Busca concluída no TJSP...")
-
-        st.write("🔍 Buscando jurisprudência no TJPR...")
-        resultados_tjpr = buscar_jurisprudencia_tjpr(termo)
-        st.write("✅ Busca concluída no TJPR...")
-
-        st.write("🔍 Buscando jurisprudência no TJDFT...")
-        resultados_tjdf = buscar_jurisprudencia_tjdf(termo)
-        st.write("✅ Busca concluída no TJDFT...")
-
-        st.write("🔍 Buscando jurisprudência no TJBA...")
-        resultados_tjba = buscar_jurisprudencia_tjba(termo)
-        st.write("✅ Busca concluída no TJBA...")
-
-        st.write("🔍 Buscando jurisprudência no TJAP...")
-        resultados_tjap = buscar_jurisprudencia_tjap(termo)
-        st.write("✅ Busca concluída no TJAP...")
-
-        resultados_unificados = pd.concat([resultados_tjsp, resultados_tjdf, resultados_tjba, resultados_tjap, resultados_tjpr, resultados_unificados], ignore_index=True)
-
-    # Agrupa pelo número do processo e junta os termos únicos
-    resultados_unificados = (
-        resultados_unificados
-        .groupby(['Número do Processo'], as_index=False)
-        .agg({
-            'Tribunal': 'first',
-            'Relator': 'first',
-            'Órgão Julgador': 'first',
-            'Data da Publicação': 'first',
-            'Ementa': 'first',
-            'Termos': lambda x: ', '.join(sorted(set(x)))
-        })
-    )
+class MedidorEsperas:
+    """
+    Espera por condições do WebDriverWait em vez de pausas fixas e registra
+    quanto tempo cada etapa levou de fato.
+    """
 
-    total_resultados = len(resultados_unificados)
+    def __init__(self, driver, timeouts=TIMEOUTS_ESPERA_TJSP):
+        self.driver = driver
+        self.timeouts = timeouts
+        self.tempos = {}
 
-    # 💾 Criar nome do arquivo com data e hora
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    nome_arquivo = f"resultados_{timestamp}.xlsx"
-    caminho_arquivo = os.path.join("resultados", nome_arquivo)
+    def esperar(self, etapa, condicao):
+        from selenium.webdriver.support.ui import WebDriverWait
 
-    # Criar diretório se não existir
-    os.makedirs("resultados", exist_ok=True)
+        inicio = time.perf_counter()
+        try:
+            return WebDriverWait(self.driver, self.timeouts[etapa], poll_frequency=0.2).until(condicao)
+        finally:
+            self.tempos.setdefault(etapa, []).append(time.perf_counter() - inicio)
 
-    # Salvar arquivo local
-    resultados_unificados.to_excel(caminho_arquivo, index=False)
+    def resumo(self):
+        return ", ".join(
+            f"{etapa}: {len(tempos)}x, média {sum(tempos) / len(tempos):.2f}s, máx {max(tempos):.2f}s"
+            for etapa, tempos in self.tempos.items()
+        )
 
-    # Limpar arquivos antigos da pasta (opcional: só os que começam com 'resultados_')
-    for arquivo in os.listdir("resultados"):
-        if arquivo.startswith("resultados_") and arquivo != nome_arquivo:
-            os.remove(os.path.join("resultados", arquivo))
 
-    # Criar buffer para download no Streamlit
-    buffer = io.BytesIO()
-    resultados_unificados.to_excel(buffer, index=False, engine='xlsxwriter')
-    buffer.seek(0)
+def pagina_carregada(driver):
+    return driver.execute_script("return document.readyState") == "complete"
 
-    st.download_button(
-        label=f"📥 Baixar resultados ({nome_arquivo})",
-        data=buffer,
-        file_name=nome_arquivo,
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
 
-    return resultados_unificados, total_resultados
+def buscar_jurisprudencia_tjsp_no_navegador(driver, termo, conhecidos=None):
+    navegadores = obter_pool_navegadores()
+    captcha = obter_solucionador_captcha()
+    esperas = MedidorEsperas(driver)
+    try:
+        return buscar_jurisprudencia_tjsp_com_esperas(driver, esperas, navegadores, captcha, termo, conhecidos)
+    finally:
+        print(f"⏱️ Esperas do TJSP ({termo}): {esperas.resumo()}")
 
-def buscar_jurisprudencia_tjsp(termo):
-    global captcha_token
 
-    # Sitekey do reCAPTCHA v3
-    SITE_KEY = "6LcXJIAbAAAAAOwprTGEEYwRSe-HMYD-Ys0pSR6f"
-    
-    # 🔎 URL do site do TJSP
-    URL_TJSP = "https://esaj.tjsp.jus.br/cjsg/consultaCompleta.do"
+def buscar_jurisprudencia_tjsp_com_esperas(driver, esperas, navegadores, captcha, termo, conhecidos):
+    from selenium.webdriver.common.by import By
+    from selenium.common.exceptions import TimeoutException
 
-    # Se o token expirou, gerar um novo
-    if not captcha_token or time.time() > captcha_expiration_time:
-        resolver_captcha(URL_TJSP, SITE_KEY)
-    
-    pagina = 1
-    j = 1
-    while True:  # Tenta até conseguir acessar os dados
+    for tentativa in range(1, TENTATIVAS_TJSP_NAVEGADOR + 1):
+        pagina = 1
+        j = 1
         try:
             status.info(f"📌 Buscando por: {termo} no TJSP")
 
@@ -832,16 +2011,18 @@ def buscar_jurisprudencia_tjsp(termo):
             # 📌 1. Acessar a página do TJSP
             try:
                 driver.get(URL_TJSP)
+                navegadores.registrar_navegacao(driver)
             except Exception as e:
                 print(f"Erro ao carregar a página: {e}")
                 continue
 
             # 📌 2. Preencher o campo de pesquisa
-            search_box = wait.until(EC.presence_of_element_located((By.NAME, "dados.buscaInteiroTeor")))
+            search_box = esperas.esperar("formulario", EC.presence_of_element_located((By.NAME, "dados.buscaInteiroTeor")))
             search_box.clear()
             search_box.send_keys(termo)
 
-            # Inserir solução CAPTCHA na página
+            # Inserir solução CAPTCHA na página (cada tentativa usa um token novo do pool)
+            captcha_token = captcha.obter_token()
             driver.execute_script(
                 "document.getElementById('id_recaptcha_response_token').value = arguments[0];",
                 captcha_token
@@ -857,12 +2038,12 @@ def buscar_jurisprudencia_tjsp(termo):
                 }
                 responseField.value = arguments[0];
             """, captcha_token)
-            time.sleep(1)
 
-            # 📌 3. Submeter o formulário
-            pesquisar = wait.until(EC.element_to_be_clickable((By.NAME, "pbSubmit")))
+            # 📌 3. Submeter o formulário e esperar a página de resultados substituir a de consulta
+            pesquisar = esperas.esperar("formulario", EC.element_to_be_clickable((By.NAME, "pbSubmit")))
             driver.execute_script("arguments[0].click();", pesquisar)
-            time.sleep(2)
+            esperas.esperar("envio", EC.staleness_of(pesquisar))
+            esperas.esperar("carregamento", pagina_carregada)
 
             html = driver.page_source
             with open("pagina_pos_submit.html", "w", encoding="utf-8") as f:
@@ -870,52 +2051,41 @@ def buscar_jurisprudencia_tjsp(termo):
 
             # 📌 4. Extração de dados
             resultados_finais = []
+            completo = True
 
             while True:
                 status.info(f"📄 Extraindo dados da página {pagina} do TJSP...")
 
-                time.sleep(5)
-
                 # Verifica se há linhas de resultado
-                linhas_resultado = driver.find_elements(By.CSS_SELECTOR, "tr.fundocinza1")
-                
+                try:
+                    linhas_resultado = esperas.esperar(
+                        "resultados", EC.presence_of_all_elements_located((By.CSS_SELECTOR, "tr.fundocinza1"))
+                    )
+                except TimeoutException:
+                    linhas_resultado = []
+
                 if not linhas_resultado:
                     status.info(f"⚠️ Nenhum resultado encontrado na página {pagina}. Encerrando busca no TJSP.")
                     break
 
-                soup = BeautifulSoup(driver.page_source, "html.parser")
-                processos = soup.find_all("tr", class_="fundocinza1")
-
-                for processo in processos:
-                    status.info(f"✅ Pegando processo {j} do TJSP...")
-                    dados = {}
+                processos = extrair_processos_tjsp(driver.page_source)
+                status.info(f"✅ Pegando processos {j} a {j + len(processos) - 1} do TJSP...")
+                resultados_finais.extend(processos)
+                transmitir_resultados(processar_resultados_tjsp(processos, termo))
+                j += len(processos)
+                numeros_pagina = [dados.get("numero_processo") for dados in processos]
 
-                    processo_link = processo.find("a", class_="esajLinkLogin downloadEmenta")
-                    if processo_link:
-                        dados["numero_processo"] = processo_link.text.strip()
-                        dados["cdacordao"] = processo_link.get("cdacordao", None)
-
-                    if dados.get("cdacordao"):
-                        ementa_div = soup.find("div", id=f"textAreaDados_{dados['cdacordao']}")
-                        if ementa_div:
-                            dados["ementa_curta"] = ementa_div.text.strip().split("  (TJSP")[0]
-
-                    for tr in processo.find_all("tr", class_="ementaClass2"):
-                        strong = tr.find("strong")
-                        if strong:
-                            chave = strong.text.strip().replace(":", "")
-                            valor = tr.get_text().strip().replace(strong.text.strip(), "").strip()
-                            if chave and valor:
-                                dados[chave] = valor
-
-                    resultados_finais.append(dados)
-                    j += 1
+                if conhecidos and numeros_pagina and all(numero in conhecidos for numero in numeros_pagina):
+                    status.info(f"🔁 Página {pagina} do TJSP sem decisões novas. Encerrando busca incremental.")
+                    break
 
                 try:
                     proxima_pagina = driver.find_elements(By.LINK_TEXT, ">")
                     if proxima_pagina:
                         proxima_pagina[0].click()
-                        time.sleep(3)
+                        navegadores.registrar_navegacao(driver)
+                        # A página seguinte substitui as linhas atuais
+                        esperas.esperar("proxima_pagina", EC.staleness_of(linhas_resultado[0]))
                         status.info(f"Avançando para a próxima página no TJSP...")
                         pagina += 1
                     else:
@@ -923,40 +2093,31 @@ def buscar_jurisprudencia_tjsp(termo):
                         break
                 except:
                     status.error(f"Erro ao consultar a página #{pagina} do TJSP")
+                    completo = False
                     break
             try:
-                return processar_resultados_tjsp(resultados_finais, termo)
+                return processar_resultados_tjsp(resultados_finais, termo), completo
             except:
                 status.error(f"Erro ao extrair resultados do TJSP")
-                break
+                return None, False
 
+        except ErroCaptcha:
+            # Sem token não adianta tentar de novo: a busca do termo no TJSP termina aqui
+            raise
         except Exception as e:
-            status.info(f"⚠️ Erro ao acessar os dados ({e}), tentando novamente em 5s...")
-            time.sleep(5)
-            resolver_captcha(URL_TJSP, SITE_KEY)  # Gera um novo CAPTCHA antes de tentar novamente
+            if tentativa < TENTATIVAS_TJSP_NAVEGADOR:
+                status.info(f"⚠️ Erro ao acessar os dados ({e}), tentando novamente em 5s...")
+                time.sleep(5)
+    else:
+        raise ErroTjspNavegador(f"sem resultados depois de {TENTATIVAS_TJSP_NAVEGADOR} tentativas")
 
-def buscar_jurisprudencia_tjba(termo):
-    url = "https://jurisprudenciaws.tjba.jus.br/graphql"
-    headers = {"Content-Type": "application/json"}
-    
-    pagina = 0
-    resultados_completos = pd.DataFrame()
+URL_TJBA = os.environ.get("URL_TJBA", "https://jurisprudenciaws.tjba.jus.br/graphql")
+TAMANHO_PAGINA_TJBA = 10
 
-    status.info(f"📌 Buscando por: {termo} no TJBA")
+# Quantas páginas do TJBA vão em uma única requisição GraphQL (uma por alias)
+PAGINAS_POR_LOTE_TJBA = 5
 
-    while True:  # Continua até não haver mais resultados
-        payload = {
-            "operationName": "filter",
-            "variables": {
-                "decisaoFilter": {
-                    "assunto": termo,
-                    "ordenadoPor": "dataPublicacao"
-                },
-                "pageNumber": pagina,
-                "itemsPerPage": 10
-            },
-            "query": """query filter($decisaoFilter: DecisaoFilter!, $pageNumber: Int!, $itemsPerPage: Int!) {
-                filter(decisaoFilter: $decisaoFilter, pageNumber: $pageNumber, itemsPerPage: $itemsPerPage) {
+CAMPOS_FILTRO_TJBA = """
                     decisoes {
                         dataPublicacao
                         relator { nome }
@@ -967,109 +2128,227 @@ def buscar_jurisprudencia_tjba(termo):
                         numeroProcesso
                     }
                     pageCount
-                    itemCount
-                }
-            }"""
-        }
+                    itemCount"""
 
-        try:
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            json_result = response.json()
 
-            # Verificação de erro na resposta
-            if not json_result or "data" not in json_result or not isinstance(json_result["data"], dict):
-                status.error(f"❌ Resposta inesperada da API na página do TJBA {pagina}: {json_result}")
-                break  # Interrompe a busca se a resposta for inválida
+def montar_consulta_tjba(paginas):
+    """Monta uma consulta GraphQL com um alias `pN` do campo `filter` para cada página pedida."""
+    filtros = "".join(
+        f"""
+                p{pagina}: filter(decisaoFilter: $decisaoFilter, pageNumber: {pagina}, itemsPerPage: $itemsPerPage) {{{CAMPOS_FILTRO_TJBA}
+                }}"""
+        for pagina in paginas
+    )
+    return f"""query filter($decisaoFilter: DecisaoFilter!, $itemsPerPage: Int!) {{{filtros}
+            }}"""
 
-            # Extrai os dados relevantes
-            filter_data = json_result["data"].get("filter", {})
-            decisoes = filter_data.get("decisoes", [])
 
-            if not decisoes:  # Se a API não retornar mais decisões, finaliza a busca
-                status.info(f"✅ Nenhuma decisão encontrada na página {pagina}. Finalizando paginação no TJBA.")
-                break
+def consultar_paginas_tjba(termo, paginas):
+    """
+    Consulta várias páginas do TJBA em uma só requisição.
+    Retorna um dicionário {pagina: dados do filter} ou None em caso de erro.
+    """
+    parametros_cache = {"ordenadoPor": "dataPublicacao", "itemsPerPage": TAMANHO_PAGINA_TJBA}
+
+    # Só vão para a API as páginas que não estão no cache
+    resultado = {}
+    for pagina in paginas:
+        em_cache = ler_cache("TJBA", termo, pagina, parametros_cache)
+        if em_cache is not None:
+            resultado[pagina] = json.loads(em_cache)
+    paginas = [pagina for pagina in paginas if pagina not in resultado]
+    if not paginas:
+        return resultado
+
+    payload = {
+        "operationName": "filter",
+        "variables": {
+            "decisaoFilter": {
+                "assunto": termo,
+                "ordenadoPor": "dataPublicacao"
+            },
+            "itemsPerPage": TAMANHO_PAGINA_TJBA
+        },
+        "query": montar_consulta_tjba(paginas)
+    }
 
-            # Processa os dados
-            pagina_df = processar_resultados_tjba(decisoes, filter_data.get("itemCount", 0), filter_data.get("pageCount", 0), termo)
-            resultados_completos = pd.concat([resultados_completos, pagina_df], ignore_index=True)
+    try:
+        response = requisitar("TJBA", "POST", URL_TJBA, json=payload)
+        response.raise_for_status()
+        json_result = response.json()
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Erro ao acessar a API do TJBA: {e}")
+        return None
 
-            # Avança para a próxima página
-            pagina += 1
+    # Verificação de erro na resposta
+    if not json_result or "data" not in json_result or not isinstance(json_result["data"], dict):
+        status.error(f"❌ Resposta inesperada da API nas páginas {list(paginas)} do TJBA: {json_result}")
+        return None
 
-            status.info(f"Processada a página #{pagina} do TJBA")
+    for pagina in paginas:
+        resultado[pagina] = json_result["data"].get(f"p{pagina}") or {}
+        if resultado[pagina].get("decisoes"):
+            gravar_cache("TJBA", termo, pagina, json.dumps(resultado[pagina], ensure_ascii=False), parametros_cache)
+    return resultado
 
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Erro ao acessar a API do TJBA: {e}")
-            break  # Evita loop infinito em caso de erro
 
-    return resultados_completos
+def buscar_jurisprudencia_tjba(termo, conhecidos=None):
+    resultados_completos = AcumuladorResultados(transmitir=True)
+
+    status.info(f"📌 Buscando por: {termo} no TJBA")
+
+    # A primeira página informa quantas páginas existem
+    primeira = consultar_paginas_tjba(termo, [0])
+    if not primeira:
+        return resultados_completos.para_dataframe()
+
+    filter_data = primeira[0]
+    decisoes = filter_data.get("decisoes") or []
+    if not decisoes:
+        status.info("✅ Nenhuma decisão encontrada no TJBA.")
+        return resultados_completos.para_dataframe()
+
+    total_itens = filter_data.get("itemCount") or 0
+    total_paginas = filter_data.get("pageCount") or math.ceil(total_itens / TAMANHO_PAGINA_TJBA) or 1
+    pagina_df = processar_resultados_tjba(decisoes, total_itens, total_paginas, termo)
+    resultados_completos.adicionar(pagina_df)
+    status.info(f"Processada a página #1 de {total_paginas} do TJBA")
+    if pagina_ja_conhecida(pagina_df, conhecidos):
+        return resultados_completos.para_dataframe()
+
+    # As demais páginas vão em lotes com aliases, e os lotes são enviados em paralelo.
+    # No modo incremental, vai uma página por vez para poder parar na primeira sem novidades.
+    por_lote = 1 if conhecidos else PAGINAS_POR_LOTE_TJBA
+    lotes = [
+        list(range(inicio, min(inicio + por_lote, total_paginas)))
+        for inicio in range(1, total_paginas, por_lote)
+    ]
+    paralelo = 1 if conhecidos else PARALELISMO_PAGINAS
+    for lote, paginas in buscar_paginas_em_paralelo(lambda lote: consultar_paginas_tjba(termo, lote), lotes, paralelo):
+        if paginas is None and len(lote) > 1:
+            # Se o lote for recusado, tenta as páginas uma a uma
+            paginas = {}
+            for pagina in lote:
+                resultado = consultar_paginas_tjba(termo, [pagina])
+                if resultado is None:
+                    break
+                paginas.update(resultado)
+        if not paginas:
+            break
+
+        fim = False
+        for pagina in lote:
+            decisoes = paginas.get(pagina, {}).get("decisoes") or []
+            if not decisoes:
+                fim = True
+                break
+            pagina_df = processar_resultados_tjba(decisoes, total_itens, total_paginas, termo)
+            resultados_completos.adicionar(pagina_df)
+            status.info(f"Processada a página #{pagina + 1} de {total_paginas} do TJBA")
+            if pagina_ja_conhecida(pagina_df, conhecidos):
+                fim = True
+                break
+        if fim:
+            break
+
+    return resultados_completos.para_dataframe()
 
-def buscar_jurisprudencia_tjdf(termo):
-    pagina = 0
-    resultados_completos = pd.DataFrame()
-    total_hits = 0
+def buscar_jurisprudencia_tjdf(termo, conhecidos=None):
+    resultados_completos = AcumuladorResultados(transmitir=True)
 
     status.info(f"📌 Buscando por: {termo} no TJDFT")
 
     try:
-        json_result, total_hits = consultar_resultados_tjdf_por_pagina(termo, pagina)
+        # A primeira página já traz o total de resultados e é aproveitada
+        json_result, total_hits = consultar_resultados_tjdf_por_pagina(termo, 0)
         if not json_result:
-            return resultados_completos
-
-        while len(resultados_completos) < total_hits:
-            json_result, _ = consultar_resultados_tjdf_por_pagina(termo, pagina)
-            if json_result:
-                pagina_df = processar_resultados_tjdf(json_result, termo)
-                resultados_completos = pd.concat([resultados_completos, pagina_df], ignore_index=True)
-                pagina += 1
-                status.info(f"Processada a página #{pagina} do TJDFT")
-            else:
+            return resultados_completos.para_dataframe()
+
+        pagina_df = processar_resultados_tjdf(json_result, termo)
+        resultados_completos.adicionar(pagina_df)
+        status.info("Processada a página #1 do TJDFT")
+        if pagina_ja_conhecida(pagina_df, conhecidos):
+            return resultados_completos.para_dataframe()
+
+        # Com o total conhecido, as demais páginas são buscadas em paralelo
+        # (uma por vez no modo incremental, para parar na primeira sem novidades)
+        total_paginas = math.ceil(total_hits / TAMANHO_PAGINA_TJDF)
+        paginas = buscar_paginas_em_paralelo(
+            lambda pagina: consultar_resultados_tjdf_por_pagina(termo, pagina)[0],
+            range(1, total_paginas),
+            1 if conhecidos else PARALELISMO_PAGINAS
+        )
+        for pagina, json_result in paginas:
+            if not json_result:
+                continue  # página perdida (já informada); as seguintes ainda podem vir
+            pagina_df = processar_resultados_tjdf(json_result, termo)
+            resultados_completos.adicionar(pagina_df)
+            status.info(f"Processada a página #{pagina + 1} do TJDFT")
+            if pagina_ja_conhecida(pagina_df, conhecidos):
                 break
 
     except Exception as e:
         status.error(f"Erro ao buscar TJDFT: {e}")
 
-    return resultados_completos
+    return resultados_completos.para_dataframe()
 
     # Função para consultar resultados na API do TJDFT
 
-def buscar_jurisprudencia_tjpr(termo):
-    pagina = 1
-    resultados_completos = pd.DataFrame()
-    total_hits = 0
+def buscar_jurisprudencia_tjpr(termo, conhecidos=None):
+    resultados_completos = AcumuladorResultados(transmitir=True)
 
     status.info(f"📌 Buscando por: {termo} no TJPR")
 
+    def baixar_e_processar(pagina):
+        html, _ = consultar_resultados_tjpr_por_pagina(termo, pagina)
+        return processar_resultados_tjpr(html, termo) if html else None
+
     try:
-        # Primeira consulta para obter o total de registros
-        html, total_hits = consultar_resultados_tjpr_por_pagina(termo, pagina)
+        # A primeira página traz o total de registros e já é processada
+        html, total_hits = consultar_resultados_tjpr_por_pagina(termo, 1)
         if not html or total_hits == 0:
-            return resultados_completos
-        while len(resultados_completos) < total_hits:
-            html, _ = consultar_resultados_tjpr_por_pagina(termo, pagina)
-            if html:
-                pagina_df = processar_resultados_tjpr(html, termo)
-                resultados_completos = pd.concat([resultados_completos, pagina_df], ignore_index=True)
-                status.info(f"Processada a página #{pagina} do TJPR")
-                pagina += 1
-            else:
+            return resultados_completos.para_dataframe()
+
+        pagina_df = processar_resultados_tjpr(html, termo)
+        resultados_completos.adicionar(pagina_df)
+        status.info("Processada a página #1 do TJPR")
+        if pagina_ja_conhecida(pagina_df, conhecidos):
+            return resultados_completos.para_dataframe()
+
+        # As demais páginas são baixadas e processadas nas threads do pool, na ordem original
+        # (uma por vez no modo incremental, para parar na primeira sem novidades)
+        total_paginas = math.ceil(total_hits / TAMANHO_PAGINA_TJPR)
+        paralelo = 1 if conhecidos else PARALELISMO_PAGINAS
+        for pagina, pagina_df in buscar_paginas_em_paralelo(baixar_e_processar, range(2, total_paginas + 1), paralelo):
+            if pagina_df is None:
+                continue  # página perdida (já informada); as seguintes ainda podem vir
+            resultados_completos.adicionar(pagina_df)
+            status.info(f"Processada a página #{pagina} do TJPR")
+            if pagina_ja_conhecida(pagina_df, conhecidos):
                 break
 
     except Exception as e:
         status.error(f"Erro ao buscar TJPR: {e}")
 
-    return resultados_completos
+    return resultados_completos.para_dataframe()
 
-def buscar_jurisprudencia_tjap(termo):
-    url = "https://tucujuris.tjap.jus.br/api/publico/consultar-jurisprudencia"
-    headers = {"Content-Type": "application/json"}
+URL_TJAP = os.environ.get("URL_TJAP", "https://tucujuris.tjap.jus.br/api/publico/consultar-jurisprudencia")
+
+def buscar_jurisprudencia_tjap(termo, conhecidos=None):
     payload = {"ementa": termo}
 
     status.info(f"📌 Buscando por: {termo} no TJAP")
 
-    response = requests.post(url, headers=headers, json=payload)
-    return processar_resultados_tjap(response.json() if response.status_code == 200 else {"error": "Falha na requisição"}, termo)
+    em_cache = ler_cache("TJAP", termo, 0, payload)
+    if em_cache is not None:
+        resultados = processar_resultados_tjap(json.loads(em_cache), termo)
+    else:
+        response = requisitar("TJAP", "POST", URL_TJAP, json=payload)
+        if response.status_code == 200:
+            gravar_cache("TJAP", termo, 0, response.text, payload)
+        resultados = processar_resultados_tjap(response.json() if response.status_code == 200 else {"error": "Falha na requisição"}, termo)
+    transmitir_resultados(resultados)
+    return resultados
 
 def processar_resultados_tjsp(decisoes, termo):
     resultados = []
@@ -1141,86 +2420,71 @@ def processar_resultados_tjdf(json_result, termo):
 
     return pd.DataFrame(resultados)
 
-def processar_resultados_tjpr(html_result, termo):
+# 📌 Padrões do TJPR, compilados uma vez e combinados em uma única varredura da página.
+# Cada alternativa captura um campo; a âncora DOCn marca o início de um novo documento.
+# O "<" comum fica fora da alternância para o regex pular rápido o texto entre as tags.
+PADRAO_TJPR = re.compile(
+    r'<(?:'
+    r'(?P<doc>a name="DOC\d+"></a>)'
+    r'|b>(?:'
+    r'Processo:</b>(?:(?!<a name="DOC)[\s\S])*?<div[^>]*>\s*<div[^>]*>(?P<processo>[\s\S]*?)</div>'
+    r'|Relator\(a\):</b>\s*(?P<relator>[\w\sÁÉÍÓÚáéíóúãõçü-]+)'
+    r'|Órgão Julgador:</b>\s*(?P<orgao>[^<\n]*)<'
+    r'|Fonte/Data da Publicação:</b>\s*&nbsp;(?P<data>[\w\s\d:]+BRT\s\d{4})'
+    r')'
+    r'|div id="ementa\d+"[^>]*>(?P<ementa>[\s\S]*?)</div>'
+    r')'
+)
+PADRAO_TAG_HTML = re.compile(r'<[^>]+>')
+CAMPOS_TJPR = ("processo", "relator", "orgao", "data", "ementa")
+
+
+def extrair_registros_tjpr(html_result, termo):
+    """
+    Extrai os registros de uma página de resultados do TJPR em uma única passada,
+    capturando só os campos usados no resultado.
+    """
     if not html_result:
-        return pd.DataFrame()
-
-    # 📌 Divide o HTML em blocos baseados nas âncoras dos documentos
-    documentos = re.split(r'<a name="DOC\d+"></a>', html_result)
-
-    dados_processos = []
-
-    for i, doc_html in enumerate(documentos[1:], start=1):
-        doc_id = f"DOC{i + 1}"  # Nome do documento atual (DOC1, DOC2, etc.)
-
-        # 📌 Captura o número do processo corretamente
-        processos = re.findall(r'<b>Processo:</b>.*?<div[^>]*>\s*<div[^>]*>(.*?)</div>', doc_html, re.DOTALL)
-
-        # 📌 Segredo de Justiça
-        segredo_justica = re.findall(r'<b>Segredo de Justiça:</b>\s*(.*?)<', doc_html)
-
-        # 📌 Captura nome do relator corretamente
-        relatores = re.findall(r'<b>Relator\(a\):</b>\s*([\w\sÁÉÍÓÚáéíóúãõçü-]+)', doc_html)
-
-        # 📌 Captura cargo do relator, se existir
-        cargos_relatores = re.findall(r'<b>Relator\(a\):</b>.*?<i>(.*?)</i>', doc_html, re.DOTALL)
-
-        # Se não houver cargo, preencher com "N/A"
-        cargos_relatores += ["N/A"] * (len(relatores) - len(cargos_relatores))
-
-        # 📌 Outros campos básicos
-        orgaos = re.findall(r'<b>Órgão Julgador:</b>\s*(.*?)<', doc_html)
-        comarcas = re.findall(r'<b>Comarca:</b>\s*(.*?)<', doc_html)
-        datas_julgamento = re.findall(r'<b>Data do Julgamento:</b>\s*([\w\s:]+BRT\s\d{4})', doc_html)
-
-        # 📌 Captura da Data da Publicação corrigida
-        datas_publicacao = re.findall(r'<b>Fonte/Data da Publicação:</b>\s*&nbsp;([\w\s\d:]+BRT\s\d{4})', doc_html)
-
-        ementas = re.findall(r'<div id="ementa\d+"[^>]*>(.*?)</div>', doc_html, re.DOTALL)
-        integras = re.findall(r'<div\s+id="texto\d+"[^>]*>(.*?)<\/div>', doc_html, re.DOTALL | re.IGNORECASE)
-        anexos = re.findall(r"document\.location\.replace\('(/jurisprudencia/publico/visualizacao\.do\?tjpr\.url\.crypto=[^']+)'\)", doc_html)
-
-        # 📌 Limpeza de tags HTML
-        ementas = [re.sub(r'<[^>]+>', '', e).strip() for e in ementas]
-        integras = [re.sub(r'<[^>]+>', '', i).strip() for i in integras]
-        anexos = ["https://portal.tjpr.jus.br" + link if link else "N/A" for link in anexos]
-
-        # 📌 Ajustando tamanhos das listas
-        max_len = max(len(processos), len(segredo_justica), len(relatores), len(cargos_relatores),
-                      len(orgaos), len(comarcas), len(datas_julgamento), len(datas_publicacao),
-                      len(ementas), len(integras), len(anexos), 1)  # Garante pelo menos uma entrada
-        
-        processos += ["N/A"] * (max_len - len(processos))
-        segredo_justica += ["N/A"] * (max_len - len(segredo_justica))
-        relatores += ["N/A"] * (max_len - len(relatores))
-        cargos_relatores += ["N/A"] * (max_len - len(cargos_relatores))
-        orgaos += ["N/A"] * (max_len - len(orgaos))
-        comarcas += ["N/A"] * (max_len - len(comarcas))
-        datas_julgamento += ["N/A"] * (max_len - len(datas_julgamento))
-        datas_publicacao += ["N/A"] * (max_len - len(datas_publicacao))
-        ementas += ["N/A"] * (max_len - len(ementas))
-        integras += ["N/A"] * (max_len - len(integras))
-        anexos += ["N/A"] * (max_len - len(anexos))
-
-        for j in range(max_len):
-            dados_processos.append({
+        return []
+
+    registros = []
+    documento = None
+
+    def fechar(documento):
+        # Um documento pode ter mais de um valor por campo; completa com "N/A" como antes
+        total = max(1, *(len(valores) for valores in documento.values()))
+        for j in range(total):
+            valores = {campo: documento[campo][j] if j < len(documento[campo]) else "N/A" for campo in CAMPOS_TJPR}
+            registros.append({
                 "Tribunal": "TJPR",
                 "Termos": termo,
-                "Número do Processo": processos[j],
-                "Relator": relatores[j],
-                "Órgão Julgador": orgaos[j],
-                "Data da Publicação": datas_publicacao[j],  # 🔥 Captura correta
-                "Ementa": ementas[j],
-
-                #"Segredo de Justiça": segredo_justica[j],
-                #"Cargo do Relator": cargos_relatores[j],
-                #"Comarca": comarcas[j],
-                #"Data do Julgamento": datas_julgamento[j],
-                #"Inteiro Teor": integras[j],
-                #"Documento Anexo": anexos[j]
+                "Número do Processo": valores["processo"],
+                "Relator": valores["relator"],
+                "Órgão Julgador": valores["orgao"],
+                "Data da Publicação": valores["data"],
+                "Ementa": valores["ementa"],
             })
 
-    return pd.DataFrame(dados_processos)
+    for achado in PADRAO_TJPR.finditer(html_result):
+        campo = achado.lastgroup
+        if campo == "doc":
+            if documento is not None:
+                fechar(documento)
+            documento = {campo: [] for campo in CAMPOS_TJPR}
+        elif documento is not None:
+            valor = achado.group(campo)
+            if campo == "ementa":
+                valor = PADRAO_TAG_HTML.sub('', valor).strip()
+            documento[campo].append(valor)
+
+    if documento is not None:
+        fechar(documento)
+
+    return registros
+
+
+def processar_resultados_tjpr(html_result, termo):
+    return pd.DataFrame(extrair_registros_tjpr(html_result, termo))
 
 def processar_resultados_tjap(json_result, termo):
     decisoes = json_result.get("dados", [])
@@ -1243,57 +2507,61 @@ def processar_resultados_tjap(json_result, termo):
 
     return pd.DataFrame(resultados)
 
+URL_TJDF = os.environ.get("URL_TJDF", "https://jurisdf.tjdft.jus.br/api/v1/pesquisa")
+TAMANHO_PAGINA_TJDF = 10
+
 def consultar_resultados_tjdf_por_pagina(termos, pagina):
-    url = "https://jurisdf.tjdft.jus.br/api/v1/pesquisa"
     payload = {
         "query": termos,
         "termosAcessorios": [],
         "pagina": pagina,
-        "tamanho": 10,
+        "tamanho": TAMANHO_PAGINA_TJDF,
         "sinonimos": True,
         "espelho": True,
         "inteiroTeor": True,
         "retornaInteiroTeor": False,
         "retornaTotalizacao": True
     }
-    headers = {"Content-Type": "application/json"}
+
+    em_cache = ler_cache("TJDFT", termos, pagina, payload)
+    if em_cache is not None:
+        json_result = json.loads(em_cache)
+        return json_result, json_result.get("hits", {}).get("value", 0)
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        # Os 500 do TJDFT (e outras falhas temporárias) são repetidos pelo controlador de tráfego
+        response = requisitar("TJDFT", "POST", URL_TJDF, json=payload)
         response.raise_for_status()  # Isso levanta um erro se o status for >= 400
         json_result = response.json()
         total_hits = json_result.get("hits", {}).get("value", 0)
+        gravar_cache("TJDFT", termos, pagina, response.text, payload)
         return json_result, total_hits
-    except requests.exceptions.HTTPError as e:
-        if response.status_code == 500:
-            st.warning("O servidor do TJDFT retornou um erro 500. Tentando continuar sem ele...")
-        else:
-            st.error(f"Erro ao acessar a API do TJDFT: {e}")
-        return None, 0
     except requests.exceptions.RequestException as e:
-        st.error(f"Erro de conexão com o TJDFT: {e}")
+        status.error(f"Erro ao acessar a página #{pagina + 1} da API do TJDFT: {e}")
         return None, 0
 
+URL_TJPR = os.environ.get("URL_TJPR", "https://portal.tjpr.jus.br/jurisprudencia/publico/pesquisa.do")
+TAMANHO_PAGINA_TJPR = 10
+
 def consultar_resultados_tjpr_por_pagina(termo, pagina):
-    url = "https://portal.tjpr.jus.br/jurisprudencia/publico/pesquisa.do"
     params = {
         "actionType": "pesquisar",
         "criterioPesquisa": termo,
         "idLocalPesquisa": "1",
         "mostrarCompleto": "true",
         "iniciar": "Pesquisar",
-        "pageSize": "10",
+        "pageSize": str(TAMANHO_PAGINA_TJPR),
         "pageNumber": pagina
     }
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
-    }
+    html = ler_cache("TJPR", termo, pagina, params)
 
     try:
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        html = response.text
+        if html is None:
+            response = requisitar("TJPR", "GET", URL_TJPR, params=params)
+            response.raise_for_status()
+            html = response.text
+            gravar_cache("TJPR", termo, pagina, html, params)
 
         # Extraindo o número total de registros usando regex
         match = re.search(r'(\d+)\s+registro\(s\)\s+encontrado\(s\)', html)
@@ -1305,72 +2573,243 @@ def consultar_resultados_tjpr_por_pagina(termo, pagina):
         print(f"Erro ao acessar o TJPR: {e}")
         return None, 0
 
-def resolver_captcha(url, site_key):
-    global captcha_token, captcha_expiration_time
-    print("🔄 Resolvendo CAPTCHA com 2Captcha...")
+# 🧩 Tokens do reCAPTCHA resolvidos em segundo plano pelo 2Captcha
+URL_2CAPTCHA = os.environ.get("URL_2CAPTCHA", "http://2captcha.com")
+TAMANHO_POOL_CAPTCHA = 2
+VALIDADE_TOKEN_CAPTCHA = 120  # Token válido por 2 minutos
+TEMPO_MEDIO_SOLUCAO_CAPTCHA = 40  # Tokens que vencem antes disso já são repostos
+INTERVALO_CONSULTA_CAPTCHA = 5
+PRAZO_MAXIMO_CAPTCHA = 180
+# Sem pedidos por esse tempo, o pool para de ser reposto. Uma validade de token basta: o TJSP
+# pede um token por consulta, e cada solução é paga mesmo que o token vença sem uso
+OCIOSIDADE_MAXIMA_CAPTCHA = VALIDADE_TOKEN_CAPTCHA
+
+
+class ErroCaptcha(Exception):
+    """Nenhum token do reCAPTCHA ficou pronto a tempo."""
+
+
+class SolucionadorCaptcha:
+    """
+    Mantém um pequeno pool de tokens do reCAPTCHA já resolvidos.
+
+    Uma thread em segundo plano envia novos pedidos ao `in.php` antes que os tokens do pool
+    vençam e consulta todos os pedidos pendentes no `res.php` a cada poucos segundos, sem
+    bloquear as buscas. O pool só é reposto enquanto houver demanda recente
+    (`preaquecer` ou `obter_token` nos últimos OCIOSIDADE_MAXIMA_CAPTCHA segundos).
+    """
+
+    def __init__(self, url, site_key, tamanho_pool=TAMANHO_POOL_CAPTCHA):
+        self.url = url
+        self.site_key = site_key
+        self.tamanho_pool = tamanho_pool
+        self._condicao = threading.Condition()
+        self._tokens = deque()  # (token, vence_em)
+        self._pendentes = {}  # id do pedido -> enviado_em
+        self._demanda_ate = 0
+        self._thread = None
+
+    def preaquecer(self):
+        """Começa a resolver tokens antes de o TJSP precisar deles."""
+        with self._condicao:
+            self._demanda_ate = time.time() + OCIOSIDADE_MAXIMA_CAPTCHA
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name="captcha", daemon=True)
+                self._thread.start()
+            self._condicao.notify_all()
+
+    def obter_token(self, timeout=PRAZO_MAXIMO_CAPTCHA):
+        """Entrega um token válido do pool, esperando a próxima solução se o pool estiver vazio."""
+        self.preaquecer()
+        prazo = time.time() + timeout
+        with self._condicao:
+            while True:
+                self._descartar_vencidos()
+                if self._tokens:
+                    token, _ = self._tokens.popleft()
+                    self._condicao.notify_all()
+                    return token
+                restante = prazo - time.time()
+                if restante <= 0:
+                    raise ErroCaptcha(f"nenhum token resolvido em {timeout}s")
+                self._condicao.wait(min(restante, 1))
+
+    def _descartar_vencidos(self):
+        agora = time.time()
+        while self._tokens and self._tokens[0][1] <= agora:
+            self._tokens.popleft()
+
+    def _faltando(self):
+        if time.time() > self._demanda_ate:
+            return 0
+        # Tokens que vencem antes de um novo ficar pronto já contam como faltando
+        limite = time.time() + TEMPO_MEDIO_SOLUCAO_CAPTCHA
+        duraveis = sum(1 for _, vence_em in self._tokens if vence_em > limite)
+        return self.tamanho_pool - duraveis - len(self._pendentes)
+
+    def _executar(self):
+        while True:
+            try:
+                with self._condicao:
+                    self._descartar_vencidos()
+                    faltando = self._faltando()
+                for _ in range(faltando):
+                    self._enviar()
+                if self._pendentes:
+                    self._consultar_pendentes()
+            except Exception as e:
+                print(f"❌ Erro no solucionador de CAPTCHA: {e}")
+
+            with self._condicao:
+                if not self._pendentes and self._faltando() <= 0:
+                    self._condicao.wait(INTERVALO_CONSULTA_CAPTCHA * 2)
+                else:
+                    self._condicao.wait(INTERVALO_CONSULTA_CAPTCHA)
 
-    while True:  # Loop infinito até resolver corretamente
+    def _enviar(self):
         captcha_payload = {
-            'key': API_KEY,
+            'key': obter_api_key(),
             'method': 'userrecaptcha',
             'version': 'v3',
             'action': 'consulta',
             'min_score': 0.3,
-            'googlekey': site_key,
-            'pageurl': url,
+            'googlekey': self.site_key,
+            'pageurl': self.url,
             'json': 1
         }
-        captcha_response = requests.get('http://2captcha.com/in.php', params=captcha_payload).json()
+        captcha_response = obter_sessao("2CAPTCHA").get(f"{URL_2CAPTCHA}/in.php", params=captcha_payload, timeout=TIMEOUT_HTTP).json()
 
         if captcha_response["status"] != 1:
             print("❌ Erro ao enviar CAPTCHA:", captcha_response["request"])
-            time.sleep(5)
-            continue
+            return
 
-        captcha_id = captcha_response["request"]
-        print(f"🆔 CAPTCHA enviado, ID: {captcha_id}")
+        with self._condicao:
+            self._pendentes[captcha_response["request"]] = time.time()
+        print(f"🆔 CAPTCHA enviado, ID: {captcha_response['request']}")
 
-        for _ in range(10):  # Espera até 50s
-            solution_response = requests.get(
-                f"http://2captcha.com/res.php?key={API_KEY}&action=get&id={captcha_id}&json=1"
+    def _consultar_pendentes(self):
+        for captcha_id, enviado_em in list(self._pendentes.items()):
+            solution_response = obter_sessao("2CAPTCHA").get(
+                f"{URL_2CAPTCHA}/res.php?key={obter_api_key()}&action=get&id={captcha_id}&json=1",
+                timeout=TIMEOUT_HTTP
             ).json()
 
-            if solution_response["status"] == 1:
-                captcha_token = solution_response["request"]
-                captcha_expiration_time = time.time() + 120  # Token válido por 2 minutos
-                print(f"✅ CAPTCHA resolvido: {captcha_token[:30]}... (truncado)")
-                return
+            with self._condicao:
+                if solution_response["status"] == 1:
+                    token = solution_response["request"]
+                    self._tokens.append((token, time.time() + VALIDADE_TOKEN_CAPTCHA))
+                    del self._pendentes[captcha_id]
+                    self._condicao.notify_all()
+                    print(f"✅ CAPTCHA resolvido: {token[:30]}... (truncado)")
+                elif solution_response["request"] != "CAPCHA_NOT_READY" or time.time() - enviado_em > PRAZO_MAXIMO_CAPTCHA:
+                    print(f"❌ CAPTCHA {captcha_id} falhou: {solution_response['request']}")
+                    del self._pendentes[captcha_id]
 
-            print("⌛ Aguardando solução do CAPTCHA...")
-            time.sleep(5)
 
-        print("❌ CAPTCHA falhou, tentando novamente em 15s...")
-        time.sleep(15)
+@recurso_compartilhado
+def obter_solucionador_captcha():
+    """Solucionador único por processo, compartilhado entre sessões."""
+    return SolucionadorCaptcha(URL_TJSP, SITE_KEY_TJSP)
 
 # Interface do Streamlit
-st.title("🔍 TJSearch")
-st.subheader("Consulta de Jurisprudência Unificada")
-st.subheader("TJAP, TJBA, TJDFT, TJPR e TJSP")
-status = st.empty()  # espaço reservado na tela
-
-palavras_chave_input = st.text_input("Palavras-chave (separadas por vírgula)")
-palavras_chave = [p.strip() for p in palavras_chave_input.split(",") if p.strip()]
-
-if st.button("Buscar") and palavras_chave:
-    resultados_df, total_hits = buscar_jurisprudencias_unificadas(palavras_chave)
-    st.write(f"Total de resultados: {total_hits}")
-    st.write(resultados_df)
+def main():
+    global status, transmissao, modo_incremental, usar_cache
+
+    st.title("🔍 TJSearch")
+    st.subheader("Consulta de Jurisprudência Unificada")
+    st.subheader("TJAP, TJBA, TJDFT, TJPR e TJSP")
+    status = PainelStatus(st.empty())  # espaço reservado na tela
+
+    palavras_chave_input = st.text_input("Palavras-chave (separadas por vírgula)")
+    palavras_chave = list(dict.fromkeys(p.strip() for p in palavras_chave_input.split(",") if p.strip()))
+    modo_incremental = st.checkbox("Atualização incremental (busca só as decisões novas desde a última coleta)")
+    # No modo incremental as primeiras páginas precisam vir dos tribunais, não do cache
+    usar_cache = not st.checkbox("Ignorar cache e consultar os tribunais novamente") and not modo_incremental
+    mostrar_parciais = st.checkbox("Mostrar os resultados conforme chegam", value=True)
+
+    if st.button("Buscar") and palavras_chave:
+        transmissao = TransmissaoResultados(st.empty()) if mostrar_parciais else None
+        resultados_df, total_hits = buscar_jurisprudencias_unificadas(palavras_chave)
+        # Guardados na sessão para continuarem na tela quando a exportação for pedida
+        st.session_state["busca"] = {
+            "resultados": resultados_df,
+            "total": total_hits,
+            "nome": f"resultados_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}",
+        }
+        st.session_state.pop("exportacao", None)
+
+    # 📚 Resultados de buscas anteriores, lidos do acervo local
+    acervo = obter_acervo()
+    termos_acervo = acervo.termos()
+    with st.expander("Abrir resultados de buscas anteriores"):
+        termos_salvos = st.multiselect("Termos", termos_acervo)
+        tribunais_salvos = st.multiselect("Tribunais", TRIBUNAIS)
+        periodo = st.date_input("Período da coleta", value=())
+        if st.button("Abrir resultados salvos"):
+            inicio, fim = (list(periodo) + [None, None])[:2] if periodo else (None, None)
+            salvos = acervo.consultar(termos_salvos, tribunais_salvos, inicio, fim or inicio)
+            if salvos.empty:
+                st.info("Nenhum resultado guardado para esses filtros.")
+            else:
+                salvos = unificar_resultados(salvos[COLUNAS_RESULTADO])
+                st.session_state["busca"] = {
+                    "resultados": salvos,
+                    "total": len(salvos),
+                    "nome": f"acervo_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}",
+                }
+                st.session_state.pop("exportacao", None)
+
+    # 🔎 Busca local nas ementas já coletadas, sem consultar os tribunais
+    with st.expander("Buscar nas ementas já coletadas"):
+        texto_local = st.text_input("Palavras na ementa (use * no fim para buscar pelo prefixo)")
+        termos_local = st.multiselect("Só nas decisões coletadas pelos termos", termos_acervo, key="termos_local")
+        tribunais_local = st.multiselect("Só nos tribunais", TRIBUNAIS, key="tribunais_local")
+        if texto_local:
+            inicio_local = time.perf_counter()
+            encontrados = obter_indice_ementas().buscar(texto_local, termos_local, tribunais_local)
+            st.write(f"{len(encontrados)} decisões encontradas em {time.perf_counter() - inicio_local:.3f}s (máximo de 200, por relevância)")
+            for _, decisao in encontrados.head(20).iterrows():
+                st.markdown(
+                    f"**{decisao['Tribunal']} · {decisao['Número do Processo']}** ({decisao['Termos']})<br>"
+                    f"{trecho_destacado(decisao['Trecho'])}",
+                    unsafe_allow_html=True
+                )
+            if not encontrados.empty:
+                st.dataframe(encontrados.drop(columns=["Trecho"]), hide_index=True)
+
+    busca = st.session_state.get("busca")
+    if busca:
+        st.write(f"Total de resultados: {busca['total']}")
+        st.write(busca["resultados"])
+
+        # Gráfico de barras com Plotly
+        st.plotly_chart(grafico_por_tribunal(busca["resultados"]['Tribunal'].value_counts()))
+
+        # 📥 O arquivo só é gerado quando pedido, em um formato por vez
+        formato = st.radio(
+            "Formato do arquivo", list(FORMATOS_EXPORTACAO),
+            format_func=lambda formato: FORMATOS_EXPORTACAO[formato][0], horizontal=True
+        )
+        if st.button("Preparar arquivo para download"):
+            st.session_state["exportacao"] = (formato, exportar_resultados(busca["resultados"], formato))
+
+        exportacao = st.session_state.get("exportacao")
+        if exportacao:
+            formato, buffer = exportacao
+            nome_arquivo = f"{busca['nome']}.{formato}"
+            st.download_button(
+                label=f"📥 Baixar resultados ({nome_arquivo})",
+                data=buffer,
+                file_name=nome_arquivo,
+                mime=FORMATOS_EXPORTACAO[formato][1]
+            )
 
-    # Gráfico de barras com Plotly
-    contagem_tribunais = resultados_df['Tribunal'].value_counts(ascending=True).reset_index()
-    contagem_tribunais.columns = ['Tribunal', 'Número de Resultados']
+    st.caption(f"⏱️ Inicialização: {resumo_inicializacao()}")
 
-    fig = px.bar(contagem_tribunais, x='Tribunal', y='Número de Resultados', text='Número de Resultados',
-                 title='Distribuição de Resultados por Tribunal')
 
-    fig.update_traces(texttemplate='%{text}', textposition='outside')
-    fig.update_layout(uniformtext_minsize=12, uniformtext_mode='hide', xaxis_title='Tribunal', yaxis_title='Número de Resultados',
-                      xaxis_showgrid=False, yaxis_showgrid=False, font=dict(size=12))  # Aumenta o tamanho da fonte
+TEMPOS_INICIALIZACAO["módulo crawler_v4"] = time.perf_counter() - INICIO_IMPORTACAO
 
-    st.plotly_chart(fig)
 
+# O `streamlit run` executa o script como __main__; importado (ex.: busca_lote.py), nada é desenhado
+if __name__ == "__main__":
+    main()